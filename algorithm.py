@@ -1,36 +1,220 @@
 import pulp as lp
-from collections import namedtuple, defaultdict
+from collections import defaultdict
+from contextlib import contextmanager
 from itertools import combinations
+import logging
+import math
+import time
 import numpy as np
+from patterns import MAX_PATTERNS, PatternMatrix, TooManyPatterns, pattern_cache
+from model import CuttingModel
+from presolve import check_capacity, presolve
+
+logger = logging.getLogger(__name__)
 
 class Solver:
-    def __init__(self, user_input):
-        (self._stock_lengths, self._stock_quantities, 
-        self._demand_lengths, self._demand_quantities) = self._parse_input(user_input)
-        print("after parse")
-        print(f"stock lengths: {self._stock_lengths}")
-        print(f"stock quantities: {self._stock_quantities}")
-        print(f"demand lengths: {self._demand_lengths}")
-        print(f"demand quantities: {self._demand_quantities}")
+    # full - полный перебор всех вариантов раскроя
+    # column_generation - генерация столбцов (Гилмор–Гомори)
+    # heuristic - быстрый последовательный эвристический раскрой с LP-оценкой качества
+    MODES = ("full", "column_generation", "heuristic")
+    # Целевая функция равномерности на втором этапе:
+    # pairwise - средняя дистанция между всеми парами заготовок, O(k^2) переменных
+    # spread - разница между максимальным и минимальным использованием, O(k)
+    # mean - среднее отклонение использования от среднего, O(k)
+    UNIFORMITY = ("pairwise", "spread", "mean")
+    # Наибольшая длина в единицах resolution: с запасом для произведений
+    # длины на количество в int64 (check_capacity, остатки комбинаций)
+    MAX_UNITS = 2**40
+
+    def __init__(self, user_input, mode="full", uniformity="pairwise",
+                 time_limit=None, gap=None, threads=None, backend="cbc", progress=None,
+                 warm_start=None, on_incumbent=None, kerf=0, trim=0, resolution=0.001,
+                 max_patterns=MAX_PATTERNS):
+        """
+        Длины заказа и склада задаются в метрах и один раз переводятся в целые
+        единицы длины resolution (по умолчанию 0.001 - миллиметры): перебор,
+        сравнения и остатки считаются в целых числах без погрешности.
+        Длины, не кратные resolution, округляются в безопасную сторону:
+        заготовки - вниз, отрезки, пропил и торцовка - вверх.
+
+        kerf - ширина пропила в метрах: каждый рез, кроме реза точно по концу
+        заготовки, съедает kerf длины.
+        trim - припуск на торцовку в метрах: от каждой заготовки до раскроя
+        отрезается trim (сумма для обоих концов).
+
+        progress - необязательная функция, которой передаются события хода решения:
+        словари вида {"stage": "enumeration", "patterns": 1200}.
+
+        on_incumbent - необязательная функция, которой передаются промежуточные
+        решения (лучший раскрой, найденный до завершения расчёта): словари
+        {"waste": остаток, "result": текст раскроя, "plan": план как у plan()}.
+        Первое - быстрый раскрой _sequential_heuristic, затем решения первого этапа,
+        которые лучше переданных, и более равномерные решения второго этапа.
+        С CBC решения этапа передаются после его завершения, с HiGHS - сразу,
+        как решатель их находит.
+
+        max_patterns - наибольшее число комбинаций полного перебора (режим full).
+        Память перебора и модели растёт с числом комбинаций, поэтому заказ,
+        для которого их больше, не решается точно: предлагается генерация столбцов.
+        None - без ограничения.
+
+        warm_start - план предыдущего решения похожего заказа (Solver.plan()),
+        с которого решатель начинает поиск. Комбинации с отрезками,
+        которых нет в заказе, пропускаются.
+
+        Параметры решателя применяются к каждому этапу отдельно:
+            time_limit - лимит времени этапа в секундах, по истечении которого
+            используется лучшее найденное решение;
+            gap - допустимый относительный разрыв с нижней оценкой (0.01 = 1%);
+            threads - количество потоков;
+            backend - "cbc" или "highs" (требуется пакет highspy).
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if uniformity not in self.UNIFORMITY:
+            raise ValueError(f"Unknown uniformity: {uniformity}")
+        if backend not in CuttingModel.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == "highs" and not lp.HiGHS(msg=False).available():
+            raise ValueError("HiGHS backend requires the highspy package")
+        if resolution <= 0:
+            raise ValueError(f"Resolution must be positive: {resolution}")
+        if kerf < 0 or trim < 0:
+            raise ValueError(f"Kerf and trim must be non-negative: {kerf}, {trim}")
+        self._mode = mode
+        self._uniformity = uniformity
+        self._max_patterns = max_patterns
+        self._solver_options = {"backend": backend, "time_limit": time_limit,
+                                "gap": gap, "threads": threads}
+        self._lp_bound = None
+        self._waste_bound = None
+        self._stats = {"timings": {}}
+        self._progress = progress
+        self._warm_start = warm_start
+        self._used_patterns = None
+        self._on_incumbent = on_incumbent
+        self._incumbent_waste = None
+        self._resolution = resolution
+        # Знаков после запятой при выводе длин в метрах
+        self._decimals = max(0, math.ceil(-math.log10(resolution) - 1e-9))
+        self._kerf = self._to_units(kerf, round_up=True)
+        self._trim = self._to_units(trim, round_up=True)
+        with self._timed("parse"):
+            (self._stock_lengths, self._stock_quantities,
+            self._demand_lengths, self._demand_quantities) = self._parse_input(user_input)
+        logger.debug("after parse: stock %s x %s, demand %s x %s",
+                     self._stock_lengths, self._stock_quantities,
+                     self._demand_lengths, self._demand_quantities)
     
     def solve(self):
-        message = self._validate_data()
-        print("after validation")
-        print(f"stock lengths: {self._stock_lengths}")
-        print(f"stock quantities: {self._stock_quantities}")
-        print(f"demand lengths: {self._demand_lengths}")
-        print(f"demand quantities: {self._demand_quantities}")
+        with self._timed("validate"):
+            message = self._validate_data()
+        logger.debug("after validation: stock %s x %s, demand %s x %s",
+                     self._stock_lengths, self._stock_quantities,
+                     self._demand_lengths, self._demand_quantities)
         if message != "OK":
             return message
-        self._patterns = self._make_cutting_patterns()
-        print(f"cutting patterns: {self._patterns}")
+        if not check_capacity(self._stock_units, self._stock_quantities,
+                              self._demand_units, self._demand_quantities):
+            return "Раскрой невозможен, недостаточно заготовок на складе"
+        if self._mode == "heuristic":
+            return self._solve_heuristic()
+        heuristic = None
+        if self._on_incumbent is not None or self._mode == "column_generation":
+            heuristic = self._sequential_heuristic()
+        if heuristic is not None and self._on_incumbent is not None:
+            # Быстрый раскрой - первое промежуточное решение, пока идёт перебор и поиск
+            self._report_incumbent(*heuristic)
+        self._report("enumeration")
+        with self._timed("enumerate"):
+            if self._mode == "column_generation":
+                # Комбинации эвристики гарантируют, что среди столбцов есть допустимый раскрой;
+                # он же - начальное решение для решателя, если план не задан
+                self._patterns = self._generate_patterns(seed=heuristic[0] if heuristic is not None else None)
+                if heuristic is not None and not self._warm_start:
+                    self._warm_start = self._make_plan(*heuristic)
+            else:
+                try:
+                    self._patterns = self._make_cutting_patterns()
+                except TooManyPatterns as e:
+                    logger.warning("enumeration stopped: more than %s patterns", self._max_patterns)
+                    self._stats["patterns"] = e.args[0]
+                    return (f"Слишком много комбинаций раскроя для точного расчёта "
+                            f"(больше {self._max_patterns}): выберите расчёт генерацией столбцов")
+        with self._timed("presolve"):
+            self._patterns, self._stock_rows, self._stats["presolve"] = presolve(
+                self._patterns, self._stock_quantities, self._demand_quantities)
+        logger.info("presolve: %s", self._stats["presolve"])
+        if self._stats["presolve"]["uncovered"]:
+            return "Раскрой невозможен, недостаточно заготовок на складе"
+        self._stats["patterns"] = len(self._patterns)
+        logger.debug("cutting patterns: %d", len(self._patterns))
+        self._report("min_waste", patterns=len(self._patterns))
         min_waste = self._find_min_waste()
+        if min_waste in (None, -1) and self._mode == "column_generation":
+            if heuristic is not None:
+                return self._heuristic_fallback(*heuristic)
+            if min_waste == -1:
+                # Сгенерированных столбцов может не хватить, это не доказывает невозможность раскроя
+                return "Не удалось найти раскрой на сгенерированных комбинациях, попробуйте точный расчёт"
+        if min_waste is None:
+            return "Не удалось найти раскрой за отведённое время"
         if min_waste == -1:
             return "Раскрой невозможен, недостаточно заготовок на складе"
+        self._stats["waste"] = self._to_meters(min_waste)
+        self._report("uniform", min_waste=self._stats["waste"])
         result = self._find_uniform_solution(min_waste)
+        self._report("done")
+        logger.info("solved: %d patterns, %d variables, waste %s, %.3f s",
+                    self._stats["patterns"], self._stats["variables"], self._stats["waste"],
+                    sum(self._stats["timings"].values()))
         return result
 
-        
+    @property
+    def stats(self):
+        """
+        Статистика последнего решения:
+            timings - время этапов в секундах (parse, validate, enumerate, presolve,
+            build_model, min_waste, uniform, format);
+            presolve - отчёт о сокращении модели (см. presolve.presolve);
+            patterns, variables, constraints - размер модели;
+            waste - найденный минимальный остаток в метрах;
+            min_waste_status, uniform_status - статусы решателя на этапах;
+            used_stock - количество использованных заготовок каждой длины.
+        """
+        return self._stats
+
+    @contextmanager
+    def _timed(self, stage):
+        """Записывает время выполнения блока в stats["timings"][stage]"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stats["timings"][stage] = time.perf_counter() - start
+
+    def _report(self, stage, **data):
+        """Передаёт событие хода решения в функцию progress, если она задана"""
+        if self._progress is not None:
+            self._progress({"stage": stage, **data})
+
+    def _report_incumbent(self, patterns, used_patterns, uniform=False):
+        """
+        Передаёт промежуточное решение в функцию on_incumbent, если она задана
+        и остаток меньше, чем у переданного ранее. Решения второго этапа
+        (uniform=True) имеют тот же остаток, но более равномерны, они передаются всегда.
+        """
+        if self._on_incumbent is None:
+            return
+        waste = int(np.dot(patterns.waste, used_patterns))
+        if not uniform and self._incumbent_waste is not None and waste >= self._incumbent_waste:
+            return
+        self._incumbent_waste = waste
+        self._on_incumbent({
+            "waste": self._to_meters(waste),
+            "result": self._format_solution(used_patterns, waste, patterns),
+            "plan": self._make_plan(patterns, used_patterns),
+        })
 
     def _parse_input(self, user_input):
         """Преобразует входные данные"""
@@ -53,6 +237,9 @@ class Solver:
 
         # проверяем склад
         for stock_len, stock_qty in zip(self._stock_lengths, self._stock_quantities):
+            message = self._check_length(stock_len)
+            if message is not None:
+                return message
             if stock_len < 0 or stock_qty < 0:
                 message = "Не должно быть отрицательных чисел"
                 return message
@@ -62,12 +249,18 @@ class Solver:
 
         # проверяем отрезки
         for demand_len, demand_qty in zip(self._demand_lengths, self._demand_quantities):
+            message = self._check_length(demand_len)
+            if message is not None:
+                return message
             if demand_len < 0 or demand_qty < 0:
                 message = "Не должно быть отрицательных чисел"
                 return message
+            if demand_len == 0 and demand_qty > 0:
+                message = "Длина отрезка должна быть больше нуля"
+                return message
             # нули принимаются как за несуществующий отрезок
             if demand_qty > 0:
-                new_demand[demand_len] = demand_qty
+                new_demand[demand_len] += demand_qty
         
         if len(new_stock) == 0:
             message = "На складе пусто. Введите хотя бы одно количество, большее нуля"
@@ -76,93 +269,396 @@ class Solver:
             message = "Заказ пуст. Введите хотя бы одно количество, большее нуля"
             return message
 
-        for length in new_demand.keys():
-            if length > max(new_stock.keys()):
-                message = f"Нельзя получить отрезки длины {length} м. при текущих исходных материалах"
-                return message
-        
-        self._stock_lengths, self._stock_quantities = list(new_stock.keys()), list(new_stock.values())
-        self._demand_lengths, self._demand_quantities = list(new_demand.keys()), list(new_demand.values())
-        
+        self._canonicalize(new_stock, new_demand)
+        self._convert_units()
+
+        # с учётом торцовки заготовки и пропила
+        too_long = np.flatnonzero(self._demand_units > self._stock_units.max())
+        if len(too_long):
+            length = self._demand_lengths[too_long[0]]
+            message = f"Нельзя получить отрезки длины {length} м. при текущих исходных материалах"
+            return message
+
         return "OK"
+
+    def _check_length(self, length):
+        """Сообщение об ошибке, если длину нельзя перевести в целые единицы, иначе None"""
+        if not math.isfinite(length):
+            return "Длины должны быть конечными числами"
+        if abs(length) / self._resolution > self.MAX_UNITS:
+            return f"Слишком большая длина: {length} м"
+        return None
+
+    def _canonicalize(self, stock, demand):
+        """
+        Приводит заказ к каноническому виду: строки с одинаковой длиной объединены,
+        нулевые количества отброшены (это делает _validate_data),
+        длины отсортированы по возрастанию.
+        Заказы, отличающиеся только порядком строк, получают одинаковые атрибуты.
+        """
+        self._stock_lengths = sorted(stock.keys())
+        self._stock_quantities = [stock[length] for length in self._stock_lengths]
+        self._demand_lengths = sorted(demand.keys())
+        self._demand_quantities = [demand[length] for length in self._demand_lengths]
+
+    def _convert_units(self):
+        """
+        Переводит длины канонического заказа в целые единицы (self._stock_units,
+        self._demand_units), с которыми работают перебор, эвристики и модель.
+
+        Пропил учитывается так: отрезок занимает l + kerf, а заготовка вмещает
+        L - trim + kerf, потому что после последнего отрезка резать не нужно,
+        если он заканчивается точно на конце заготовки. Остаток вместимости r
+        превращается в обрезок r - kerf (см. _offcut).
+        """
+        stock_units = [self._to_units(length) for length in self._stock_lengths]
+        demand_units = [self._to_units(length, round_up=True) for length in self._demand_lengths]
+        # Заготовка короче торцовки непригодна: вместимость 0
+        self._stock_units = np.maximum(np.array(stock_units, dtype=np.int64) - self._trim + self._kerf, 0)
+        self._demand_units = np.array(demand_units, dtype=np.int64) + self._kerf
+
+    def _to_units(self, length, round_up=False):
+        """Длина в метрах -> целое число единиц resolution (вниз или вверх, если не кратна)"""
+        units = length / self._resolution
+        nearest = round(units)
+        # 2.3 / 0.001 = 2299.9999999999995: такая длина кратна resolution
+        if abs(units - nearest) < 1e-6:
+            return nearest
+        return math.ceil(units) if round_up else math.floor(units)
+
+    def _to_meters(self, units):
+        """Длина в единицах resolution -> метры, округлённые до точности resolution"""
+        return round(float(units) * self._resolution, self._decimals)
+
+    def _offcut(self, remainder):
+        """
+        Обрезок по остатку вместимости заготовки (в единицах): при ненулевом остатке
+        последний отрезок отделяется ещё одним пропилом, остаток не больше
+        пропила уходит в опилки.
+        """
+        return np.maximum(remainder - self._kerf, 0)
+
+    def order_key(self):
+        """
+        Возвращает канонический ключ заказа вместе с параметрами решения
+        (для кэширования результатов) или None, если данные некорректны.
+        """
+        if self._validate_data() != "OK":
+            return None
+        return (
+            tuple(zip(self._stock_lengths, self._stock_quantities)),
+            tuple(zip(self._demand_lengths, self._demand_quantities)),
+            self._mode,
+            self._uniformity,
+            tuple(sorted(self._solver_options.items())),
+            (self._resolution, self._kerf, self._trim),
+        )
     
     def _make_cutting_patterns(self):
-        Pattern = namedtuple("Pattern", ['piece_quantities', 'waste'])
-        all_patterns = []
-        for stock_len in self._stock_lengths:
-            item_patterns = []
-            iterables = []
-            for demand_len in self._demand_lengths:
-                iterables.append(range(int(stock_len//demand_len) + 1))
-            for piece_quantities, waste in self.product_iterative(iterables, stock_len):
-                item_patterns.append(Pattern(piece_quantities, waste))
-            all_patterns.append(item_patterns)
-            print(f"added item patterns: {item_patterns}")
-        return all_patterns
-    
-    def product_iterative(self, iterables, stock_len, repeat=1):
-        print(f"CURRENT ITEM: {stock_len}")
-        print(f"iterables: {iterables}")
-        pools = [tuple(pool) for pool in iterables] * repeat
-        n = len(pools)
-        
-        if n == 0:
-            raise ValueError("Empty iterables!")
-        
-        indices = [0] * (n - 1) + [1] # начинаем с индексов [0, 0, ..., 1]
-        lengths = [len(pool) for pool in pools]
-        
-        while True:
-            # генерируем текущую комбинацию
-            # кортеж вида (кол-во первого заказанного отрезка, кол-во второго отрезка и т.д.)
-            piece_quantities = tuple(pools[i][indices[i]] for i in range(n))
-            print(f"Generated combination: {piece_quantities}")
-            
-            # проверяем валидность комбинации (сумма длин отрезков должна быть меньше stock_len)
-            combo_sum = 0
-            problem_idx = None
-            for idx, (l, qty) in enumerate(zip(self._demand_lengths, piece_quantities)):
-                combo_sum += l * qty
-                if combo_sum > stock_len:
-                    problem_idx = idx
-                    break
-            if problem_idx is None:
-                # комбинация подходит
-                waste = stock_len - combo_sum
-                start = n - 1
-                print(f"Combination is returned")
-                yield piece_quantities, waste
-            else:
-                # комбинация НЕ подходит
-                print(f"Combination is NOT returned")
-                start = problem_idx - 1
-            
-            # ищем разряд для увеличения справа налево
-            for i in range(start, -1, -1):
-                if indices[i] < lengths[i] - 1:
-                    indices[i] += 1
-                    # обнуляем все индексы справа
-                    for j in range(i+1, n):
-                        indices[j] = 0
-                    break
-            else:
-                # цикл завершен без break -> все комбинации рассмотрены
+        blocks = []
+        found = 0
+        demand_units = self._demand_units.tolist()
+        for stock_len, capacity in zip(self._stock_lengths, self._stock_units.tolist()):
+            # Комбинации не зависят от остального заказа, поэтому берутся из общего кэша.
+            # Ограничение max_patterns - на все заготовки вместе
+            limit = None if self._max_patterns is None else self._max_patterns - found
+            counts, remainders = pattern_cache.enumerate(capacity, demand_units, self._demand_quantities,
+                                                         max_patterns=limit)
+            blocks.append((counts, self._offcut(remainders)))
+            found += len(remainders)
+            self._report("enumeration", patterns=found)
+            logger.debug("stock %s: %d patterns", stock_len, len(remainders))
+        return PatternMatrix.from_blocks(blocks, len(self._demand_lengths))
+
+    def _generate_patterns(self, seed=None, max_iterations=200, eps=1e-6):
+        """
+        Генерация столбцов (метод Гилмора–Гомори).
+
+        Вместо полного перебора начинает с небольшого набора комбинаций
+        и на каждой итерации решает LP-релаксацию задачи (master problem).
+        По двойственным оценкам для каждой заготовки решается задача о рюкзаке
+        с ограниченными количествами (pricing), которая находит комбинацию
+        с отрицательной приведённой стоимостью. Комбинация добавляется в набор.
+        Когда таких комбинаций нет, значение LP - нижняя оценка остатка.
+
+        Приведённая стоимость комбинации a на заготовке вместимости C
+        (длины в единицах с учётом пропила, см. _convert_units):
+            _offcut(C - sum(l_k * a_k)) - sum(pi_k * a_k) - mu_i,
+        где pi_k - двойственные оценки заказа, mu_i - оценка ограничения склада.
+
+        seed - комбинации (PatternMatrix), которые добавляются в начальный набор,
+        например комбинации _sequential_heuristic: тогда целочисленная задача
+        на сгенерированных столбцах заведомо имеет решение.
+
+        Возвращает комбинации в том же формате, что и _make_cutting_patterns.
+        """
+        patterns = self._make_initial_patterns()
+        converged = False
+        if seed is not None:
+            for p in range(len(seed)):
+                i = int(seed.stock_index[p])
+                if not patterns.contains(i, seed.counts[p]):
+                    patterns.append(i, seed.counts[p], seed.waste[p])
+        for iteration in range(max_iterations):
+            lp_value, demand_duals, stock_duals, artificial = self._solve_master_lp(patterns)
+            logger.debug("column generation iteration %d: LP = %s", iteration, lp_value)
+
+            added = False
+            improving = False
+            for i, capacity in enumerate(self._stock_units.tolist()):
+                piece_quantities, value = self._price_pattern(capacity, demand_duals)
+                reduced_cost = -value - stock_duals[i]
+                # Двойственные оценки решатель отдаёт с округлением,
+                # поэтому допуск пропорционален вместимости заготовки
+                if reduced_cost >= -eps * capacity or sum(piece_quantities) == 0:
+                    continue
+                improving = True
+                # Комбинация с отрицательной приведённой стоимостью уже в наборе
+                # (погрешность LP) - это не сходимость, но и добавить нечего
+                if patterns.contains(i, piece_quantities):
+                    continue
+                combo_sum = int(np.dot(self._demand_units, piece_quantities))
+                patterns.append(i, piece_quantities, self._offcut(capacity - combo_sum))
+                added = True
+            if not added:
+                converged = not improving
+                break
+
+        self._stats["column_generation_iterations"] = iteration + 1
+        self._stats["column_generation_converged"] = converged
+        # Значение LP на неполном наборе столбцов - не оценка снизу, а оценка
+        # имеет смысл, только если LP обошлась без искусственных переменных
+        self._lp_bound = lp_value if converged and artificial <= eps else None
+        if not converged:
+            logger.warning("column generation stopped after %d iterations without convergence",
+                           iteration + 1)
+        return patterns
+
+    def _solve_heuristic(self):
+        """
+        Быстрый приближённый раскрой (_sequential_heuristic) без целочисленного
+        программирования. Для оценки качества считается LP-релаксация методом
+        генерации столбцов: её значение - нижняя оценка отходов любого раскроя,
+        поэтому разрыв показывает, насколько решение может быть хуже оптимального.
+        """
+        self._report("heuristic")
+        with self._timed("heuristic"):
+            plan = self._sequential_heuristic()
+        if plan is None:
+            return "Быстрый расчёт не нашёл раскрой, попробуйте точный расчёт"
+        self._patterns, used_patterns = plan
+        self._used_patterns = used_patterns
+        waste = int(np.dot(self._patterns.waste, used_patterns))
+        self._stats["patterns"] = len(self._patterns)
+        self._stats["waste"] = self._to_meters(waste)
+
+        self._report("lp_bound", waste=self._stats["waste"])
+        with self._timed("lp_bound"):
+            self._generate_patterns()
+        self._report("done")
+        with self._timed("format"):
+            output = self._format_solution(used_patterns, waste)
+            self._stats["used_stock"] = self._count_used_stock(self._patterns, used_patterns).tolist()
+        logger.info("heuristic: waste %s, LP bound %s, %.3f s",
+                    self._stats["waste"], self._lp_bound, sum(self._stats["timings"].values()))
+        return output + "\nПриближённый расчёт: точный расчёт может уменьшить отходы"
+
+    def _sequential_heuristic(self, demand_quantities=None, stock_quantities=None):
+        """
+        Последовательный эвристический раскрой (sequential heuristic procedure).
+
+        На каждом шаге для каждой доступной заготовки строится комбинация
+        по правилу First-Fit-Decreasing: отрезки от длинных к коротким, каждого
+        столько, сколько помещается и ещё нужно. Выбирается комбинация с наименьшей
+        долей остатка, и она повторяется, пока хватает заготовок и отрезков.
+        Число шагов не зависит от количества отрезков, только от числа длин,
+        поэтому раскрой тысяч отрезков занимает миллисекунды.
+
+        demand_quantities и stock_quantities заменяют количества заказа и склада
+        (например, чтобы дополнить частичный план).
+
+        Возвращает (PatternMatrix, количество каждой комбинации) или None,
+        если оставшиеся отрезки не помещаются в оставшиеся заготовки.
+        """
+        if demand_quantities is None:
+            demand_quantities = self._demand_quantities
+        if stock_quantities is None:
+            stock_quantities = self._stock_quantities
+        lengths = self._demand_units
+        capacities = self._stock_units
+        remaining = np.array(demand_quantities, dtype=np.int64)
+        available = list(stock_quantities)
+        plan = {}  # (индекс заготовки, кортеж количеств): количество повторений
+
+        while remaining.any():
+            best = None
+            for i, stock_capacity in enumerate(capacities.tolist()):
+                if available[i] == 0:
+                    continue
+                piece_quantities = np.zeros(len(lengths), dtype=np.int64)
+                capacity = stock_capacity
+                for k in reversed(range(len(lengths))):
+                    qty = min(remaining[k], capacity // lengths[k])
+                    piece_quantities[k] = qty
+                    capacity -= qty * lengths[k]
+                if not piece_quantities.any():
+                    continue
+                waste_part = self._offcut(capacity) / stock_capacity
+                if best is None or waste_part < best[0]:
+                    best = (waste_part, i, piece_quantities)
+            if best is None:
+                return None
+
+            _, i, piece_quantities = best
+            used = piece_quantities > 0
+            repeats = min(available[i], int((remaining[used] // piece_quantities[used]).min()))
+            remaining -= repeats * piece_quantities
+            available[i] -= repeats
+            key = (i, tuple(piece_quantities.tolist()))
+            plan[key] = plan.get(key, 0) + repeats
+
+        counts = np.array([piece_quantities for _, piece_quantities in plan], dtype=np.int64)
+        counts = counts.reshape(-1, len(lengths))
+        stock_index = np.array([i for i, _ in plan])
+        waste = self._offcut(capacities[stock_index] - counts @ lengths)
+        patterns = PatternMatrix(counts, waste, stock_index)
+        return patterns, np.array(list(plan.values()), dtype=np.int64)
+
+    def _heuristic_fallback(self, heuristic_patterns, repeats):
+        """
+        Раскрой по плану _sequential_heuristic, когда решатель не нашёл
+        целочисленного решения на сгенерированных столбцах (режим column_generation).
+        Комбинации эвристики входят в self._patterns (см. _generate_patterns).
+        """
+        used_patterns = np.zeros(len(self._patterns), dtype=np.int64)
+        for p, count in enumerate(repeats.tolist()):
+            row = self._patterns.find(int(heuristic_patterns.stock_index[p]), heuristic_patterns.counts[p])
+            if row is None:
+                return "Не удалось найти раскрой на сгенерированных комбинациях, попробуйте точный расчёт"
+            used_patterns[row] += count
+        logger.warning("column generation: no integer solution, using the heuristic plan")
+        self._used_patterns = used_patterns
+        waste = int(np.dot(self._patterns.waste, used_patterns))
+        self._stats["waste"] = self._to_meters(waste)
+        self._stats["heuristic_fallback"] = True
+        self._report("done")
+        with self._timed("format"):
+            output = self._format_solution(used_patterns, waste)
+            self._stats["used_stock"] = self._count_used_stock(self._patterns, used_patterns).tolist()
+        return output + "\nПриближённый расчёт: решатель не нашёл целочисленный раскрой, показан эвристический"
+
+    def _make_initial_patterns(self):
+        """
+        Начальный набор комбинаций для генерации столбцов:
+        для каждой заготовки и каждого отрезка - комбинация из одного отрезка
+        и однородная комбинация из максимально возможного количества отрезков.
+        Комбинации из одного отрезка нужны, чтобы целочисленная задача
+        на сгенерированных столбцах оставалась разрешимой.
+        """
+        n = len(self._demand_units)
+        blocks = []
+        for capacity in self._stock_units.tolist():
+            counts, waste = [], []
+            for k, (demand_len, demand_qty) in enumerate(zip(self._demand_units.tolist(), self._demand_quantities)):
+                max_qty = min(capacity // demand_len, demand_qty)
+                # Отрезок не помещается в эту заготовку
+                if max_qty == 0:
+                    continue
+                for qty in sorted({1, max_qty}):
+                    piece_quantities = np.zeros(n, dtype=np.int64)
+                    piece_quantities[k] = qty
+                    counts.append(piece_quantities)
+                    waste.append(self._offcut(capacity - demand_len * qty))
+            blocks.append((np.array(counts, dtype=np.int64).reshape(-1, n), np.array(waste, dtype=np.int64)))
+        return PatternMatrix.from_blocks(blocks, n)
+
+    def _solve_master_lp(self, patterns):
+        """
+        Решает LP-релаксацию задачи минимизации остатков на текущем наборе комбинаций.
+        Недостача отрезков покрывается искусственными переменными с большим штрафом,
+        чтобы LP всегда была разрешима и давала двойственные оценки.
+
+        Возвращает значение LP (без штрафа), двойственные оценки заказа,
+        двойственные оценки склада и суммарное значение искусственных переменных.
+        """
+        problem = lp.LpProblem("Master_LP", lp.LpMinimize)
+        penalty = int(np.dot(self._stock_units, self._stock_quantities)) + 1
+
+        x = [lp.LpVariable(f"x{p}", lowBound=0) for p in range(len(patterns))]
+        artificial = [lp.LpVariable(f"a{k}", lowBound=0) for k in range(len(self._demand_lengths))]
+
+        total_waste = lp.LpAffineExpression(zip(x, patterns.waste.tolist()))
+        problem += total_waste + penalty * lp.lpSum(artificial)
+
+        for i in range(len(self._stock_lengths)):
+            used_items = lp.lpSum(x[p] for p in patterns.rows_of_stock(i))
+            problem += lp.LpConstraint(used_items, lp.LpConstraintLE,
+                                       f"stock{i}", self._stock_quantities[i])
+        for k, required in enumerate(self._demand_quantities):
+            rows = patterns.rows_with_piece(k)
+            produced = lp.LpAffineExpression(zip([x[p] for p in rows], patterns.counts[rows, k].tolist()))
+            problem += lp.LpConstraint(produced + artificial[k], lp.LpConstraintEQ,
+                                       f"demand{k}", required)
+
+        problem.solve(lp.PULP_CBC_CMD(msg=False))
+
+        demand_duals = [problem.constraints[f"demand{k}"].pi or 0
+                        for k in range(len(self._demand_lengths))]
+        stock_duals = [problem.constraints[f"stock{i}"].pi or 0
+                       for i in range(len(self._stock_lengths))]
+        artificial_sum = sum(lp.value(a) or 0 for a in artificial)
+        return lp.value(total_waste) or 0, demand_duals, stock_duals, artificial_sum
+
+    def _price_pattern(self, capacity, duals):
+        """
+        Решает задачу pricing для заготовки вместимости capacity методом ветвей и границ:
+        максимизировать sum(duals[k] * a_k) - _offcut(capacity - sum(l_k * a_k))
+        при sum(l_k * a_k) <= capacity и 0 <= a_k <= заказанного количества.
+        Длины l_k и вместимость - целые (единицы с учётом пропила, см. _convert_units).
+
+        Обрезок короче пропила (точная укладка, опилки) считается нулевым, поэтому
+        ценность не линейна. Линейная часть sum((l_k + duals[k]) * a_k) - (capacity - kerf)
+        не меньше настоящей ценности и служит верхней границей,
+        а каждая комбинация оценивается с настоящим обрезком.
+
+        Возвращает лучшую комбинацию (кортеж количеств) и её ценность.
+        """
+        lengths = self._demand_units.tolist()
+        values = [l + pi for l, pi in zip(lengths, duals)]
+        n = len(lengths)
+        # Отрезки с неположительной ценностью класть невыгодно: каждый уменьшает
+        # обрезок не больше, чем на свою длину
+        items = [k for k in range(n) if values[k] > 0 and lengths[k] <= capacity]
+        # Сортируем по удельной ценности для более точной верхней границы
+        items.sort(key=lambda k: values[k] / lengths[k], reverse=True)
+        kerf = self._kerf
+        offset = capacity - kerf
+
+        best_value = -max(offset, 0)
+        best_quantities = [0] * n
+        current = [0] * n
+
+        def search(pos, left, value):
+            nonlocal best_value, best_quantities
+            # value - линейная ценность, настоящая учитывает обрезок
+            true_value = value - (capacity - left) - max(left - kerf, 0)
+            if true_value > best_value:
+                best_value = true_value
+                best_quantities = current.copy()
+            if pos == len(items):
                 return
-    
-    def _sum_piece_quantities(self):
-        if not self._patterns:
-            return []
-
-        n = len(self._demand_quantities)
-        result = [0] * n
-
-        for stock_patterns in self._patterns:
-            for pattern in stock_patterns:
-                quantities = pattern.piece_quantities
-                for i in range(n):
-                    result[i] += quantities[i]
-        
-        return result
+            # Верхняя граница: остаток вместимости заполняется по лучшей удельной ценности
+            k = items[pos]
+            if value + left * values[k] / lengths[k] - offset <= best_value:
+                return
+            max_qty = min(left // lengths[k], self._demand_quantities[k])
+            for qty in range(max_qty, -1, -1):
+                current[k] = qty
+                search(pos + 1, left - qty * lengths[k], value + qty * values[k])
+            current[k] = 0
+
+        search(0, capacity, 0)
+        return tuple(best_quantities), best_value
 
     def _find_min_waste(self):
         """
@@ -174,76 +670,142 @@ class Solver:
         Целевая функция: сумма полученных остатков.
 
         Используемые переменные:
-            1. self._patterns - варианты раскроя для каждой заготовки, 
-            где элемент self._patterns[i][j] - одна комбинация, кортеж вида 
-            (количество_полученных_отрезков, остаток).
-            Размерность 2.
-            Количество строк - количество заготовок.
-            Количество столбцов - не фиксировано, зависит от заготовки.
-            2. x - таблица с целыми числами, 
-            где x[i][j] - количество комбинации self._patterns[i][j] в решении
-            Размер совпадает с self._patterns
+            1. self._patterns - варианты раскроя всех заготовок (PatternMatrix),
+            где строка p - одна комбинация: количества отрезков counts[p],
+            остаток waste[p] и индекс заготовки stock_index[p].
+            2. x - список целых чисел,
+            где x[p] - количество комбинации p в решении
             3. item - заготовка на складе
             4. piece - полученная заготовка в результате разреза
             5. waste - отходы
 
         Ограничения:
-            1. Количество комбинаций x[i][j] >= 0, целое.
+            1. Количество комбинаций x[p] >= 0, целое.
             2. Мы не можем использовать больше заготовок, чем на складе.
             3. Каждое полученное количество отрезков должно совпадать с заказанном количеством.
         """
-        problem = lp.LpProblem("Waste_minimization", lp.LpMinimize)
-
-        x = [[] for i in range(len(self._patterns))]
-        for i in range(len(self._patterns)):
-            for j in range(len(self._patterns[i])):
-                x[i].append(lp.LpVariable(
-                    name=f"x{i}{j}",
-                    lowBound=0,
-                    upBound=self._stock_quantities[i],
-                    cat=lp.LpInteger)) # ПЕРВОЕ ОГРАНИЧЕНИЕ
+        # ПЕРВОЕ, ВТОРОЕ И ТРЕТЬЕ ОГРАНИЧЕНИЯ
+        # Модель строится один раз и переиспользуется в _find_uniform_solution
+        with self._timed("build_model"):
+            self._model = CuttingModel(self._patterns, self._stock_quantities, self._demand_quantities,
+                                       stock_rows=self._stock_rows,
+                                       **self._solver_options)
+        self._stats["variables"] = self._model.n_variables
+        self._stats["constraints"] = self._model.n_constraints
+        problem = self._model.problem
+        x = self._model.x
 
         # ЦЕЛЕВАЯ ФУНКЦИЯ
-        total_waste = 0
-        for i in range(len(self._patterns)):
-            for j in range(len(self._patterns[i])):
-                total_waste += self._patterns[i][j].waste * x[i][j]
-
-        problem += total_waste
-
-        # ВТОРОЕ ОГРАНИЧЕНИЕ
-        for i in range(len(x)):
-            used_items = lp.lpSum(x[i])
-            problem += used_items <= self._stock_quantities[i]
-
-        # ТРЕТЬЕ ОГРАНИЧЕНИЕ
-        n = len(self._demand_quantities)
-        total_quantities = [0] * n
-
-        for i in range(len(self._patterns)):
-            for j in range(len(self._patterns[i])):
-                quantities = self._patterns[i][j].piece_quantities
-                for k in range(n):
-                    total_quantities[k] += quantities[k] * x[i][j]
-        print(f"total quantities: {total_quantities}")
-        for total, required in zip(total_quantities, self._demand_quantities):
-            problem += total == required
+        self._model.set_objective(self._model.total_waste)
 
         # РЕШЕНИЕ
-        status = problem.solve()
+        warm_start = self._set_warm_start()
+        with self._timed("min_waste"):
+            status = self._model.solve(warm_start=warm_start, on_incumbent=self._incumbent_callback())
 
         # ПОЛУЧЕНИЕ РЕЗУЛЬТАТОВ
-        min_waste = lp.value(problem.objective)
-        if status == lp.LpStatusOptimal:
-            print(f"Problem is solved!")
-            print(f"Minimal waste: {min_waste}")
-            for i in range(len(x)):
-                for j in range(len(x[i])):
-                    print(f"x{i}{j} = {lp.value(x[i][j])}; item: {self._stock_lengths[i]}")
+        self._stats["min_waste_status"] = lp.LpSolution[status]
+        if status in (lp.LpSolutionOptimal, lp.LpSolutionIntegerFeasible):
+            # Остатки комбинаций целые, поэтому и оптимальный остаток - целое число единиц
+            min_waste = round(lp.value(problem.objective))
+            logger.debug("stage 1 solved (%s), minimal waste: %s", lp.LpSolution[status], min_waste)
+            self._report_incumbent(self._patterns, self._model.solution())
+            if logger.isEnabledFor(logging.DEBUG):
+                for p in range(len(x)):
+                    logger.debug("x%d = %s; item: %s", p, lp.value(x[p]),
+                                 self._stock_lengths[self._patterns.stock_index[p]])
+            # Решатель остановлен по лимиту времени или по gap:
+            # запоминаем доказанную нижнюю оценку, чтобы показать её пользователю
+            bound = self._model.bound
+            if bound is not None:
+                # Остаток - целое число единиц, поэтому оценку можно округлить вверх
+                bound = math.ceil(bound - 1e-6)
+            if bound is not None and bound < min_waste:
+                self._waste_bound = max(bound, 0)
+                self._stats["min_waste_bound"] = self._to_meters(self._waste_bound)
             return min_waste
-        elif lp.LpStatus[problem.status] == "Infeasible":
-            print(f"No solution found!")
+        elif status == lp.LpSolutionInfeasible:
+            logger.debug("stage 1: no solution (infeasible)")
             return -1
+        # Решение не найдено (например, истёк лимит времени)
+        logger.warning("solver stopped without a solution: %s", lp.LpSolution[status])
+        return None
+
+    def plan(self):
+        """
+        План последнего решения в виде, не зависящем от порядка строк заказа:
+        список [длина заготовки, [[длина отрезка, количество], ...], повторения].
+        None, если раскрой не найден.
+        """
+        if self._used_patterns is None:
+            return None
+        return self._make_plan(self._patterns, self._used_patterns)
+
+    def _make_plan(self, patterns, used_patterns):
+        plan = []
+        for p in np.flatnonzero(used_patterns).tolist():
+            pieces = [[length, count] for length, count
+                      in zip(self._demand_lengths, patterns.counts[p].tolist()) if count > 0]
+            stock_len = self._stock_lengths[patterns.stock_index[p]]
+            plan.append([stock_len, pieces, int(used_patterns[p])])
+        return plan
+
+    def _incumbent_callback(self, uniform=False):
+        """Функция для CuttingModel.solve(on_incumbent=...) или None, если on_incumbent не задана"""
+        if self._on_incumbent is None:
+            return None
+        return lambda solution: self._report_incumbent(self._patterns, solution, uniform)
+
+    def _set_warm_start(self):
+        """
+        Задаёт начальные значения x по плану warm_start. Возвращает True,
+        если из плана удалось использовать хотя бы одну комбинацию.
+
+        План предыдущего заказа обычно не подходит новому целиком: повторения
+        комбинаций уменьшаются так, чтобы не получить лишних отрезков и не выйти
+        за склад, а недостающие отрезки добавляются _sequential_heuristic.
+        Так решатель сразу получает допустимое решение, близкое к прошлому плану.
+        """
+        if not self._warm_start:
+            return False
+        stock_index = {length: i for i, length in enumerate(self._stock_lengths)}
+        demand_index = {length: k for k, length in enumerate(self._demand_lengths)}
+        produced = np.zeros(len(self._demand_lengths), dtype=np.int64)
+        available = np.array(self._stock_quantities, dtype=np.int64)
+        initial = np.zeros(len(self._patterns), dtype=np.int64)
+        for stock_len, pieces, repeats in self._warm_start:
+            if stock_len not in stock_index or any(length not in demand_index for length, _ in pieces):
+                continue
+            i = stock_index[stock_len]
+            piece_quantities = np.zeros(len(self._demand_lengths), dtype=np.int64)
+            for length, count in pieces:
+                piece_quantities[demand_index[length]] = count
+            p = self._patterns.find(i, piece_quantities)
+            if p is None:
+                continue
+            used = piece_quantities > 0
+            left = (np.array(self._demand_quantities)[used] - produced[used]) // piece_quantities[used]
+            repeats = min(repeats, available[i], int(left.min()))
+            if repeats > 0:
+                initial[p] += repeats
+                produced += repeats * piece_quantities
+                available[i] -= repeats
+        if not initial.any():
+            return False
+
+        residual = np.array(self._demand_quantities) - produced
+        if residual.any():
+            completion = self._sequential_heuristic(residual, available)
+            if completion is not None:
+                patterns, repeats = completion
+                for p, count in enumerate(repeats.tolist()):
+                    row = self._patterns.find(int(patterns.stock_index[p]), patterns.counts[p])
+                    if row is not None:
+                        initial[row] += count
+        for variable, value in zip(self._model.x, initial.tolist()):
+            variable.setInitialValue(value)
+        self._stats["warm_start_patterns"] = int(np.count_nonzero(initial))
+        return True
 
     def _find_uniform_solution(self, min_waste):
         """
@@ -253,126 +815,168 @@ class Solver:
 
         Задача: минимизировать функцию разброса.
         
-        Целевая функция: средняя дистанция между всеми элементами
+        Целевая функция: зависит от параметра uniformity,
+        см. _make_uniformity_objective
         
         Используемые переменные:
-            1. self._patterns - варианты раскроя для каждой заготовки, 
-            где элемент self._patterns[i][j] - одна комбинация, кортеж вида 
-            (количество_полученных_отрезков, остаток).
-            Размерность 2.
-            Количество строк - количество заготовок.
-            Количество столбцов - не фиксировано, зависит от заготовки.
-            2. x - таблица с целыми числами, 
-            где x[i][j] - количество комбинации self._patterns[i][j] в решении
-            Размер совпадает с self._patterns
+            1. self._patterns - варианты раскроя всех заготовок (PatternMatrix),
+            где строка p - одна комбинация: количества отрезков counts[p],
+            остаток waste[p] и индекс заготовки stock_index[p].
+            2. x - список целых чисел,
+            где x[p] - количество комбинации p в решении
             3. item - заготовка на складе
             4. piece - полученная заготовка в результате разреза
             5. waste - отходы
-            6. distances - список дистанций между всеми возможными парами заготовок.
         
         Ограничения:
-            1. Количество комбинаций x[i][j] >= 0, целое.
+            1. Количество комбинаций x[p] >= 0, целое.
             2. Мы не можем использовать больше заготовок, чем на складе.
             3. Каждое полученное количество отрезков должно совпадать с заказанном количеством.
             4. Полученный остаток должен быть равен минимальному.
         """
-        problem = lp.LpProblem("Uniform_solution", lp.LpMinimize)
-
-        x = [[] for i in range(len(self._patterns))]
-        for i in range(len(self._patterns)):
-            for j in range(len(self._patterns[i])):
-                x[i].append(lp.LpVariable(
-                    name=f"x{i}{j}",
-                    lowBound=0,
-                    upBound=self._stock_quantities[i],
-                    cat=lp.LpInteger)) # ПЕРВОЕ ОГРАНИЧЕНИЕ
-
-        # ВТОРОЕ ОГРАНИЧЕНИЕ
-        for i in range(len(x)):
-            used_items = lp.lpSum(x[i])
-            problem += used_items <= self._stock_quantities[i]
-
-        # ТРЕТЬЕ ОГРАНИЧЕНИЕ
-        n = len(self._demand_quantities)
-        total_quantities = [0] * n
-
-        for i in range(len(self._patterns)):
-            for j in range(len(self._patterns[i])):
-                quantities = self._patterns[i][j].piece_quantities
-                for k in range(n):
-                    total_quantities[k] += quantities[k] * x[i][j]
-        print(f"total quantities: {total_quantities}")
-        for total, required in zip(total_quantities, self._demand_quantities):
-            problem += total == required
+        # ПЕРВОЕ, ВТОРОЕ И ТРЕТЬЕ ОГРАНИЧЕНИЯ уже есть в модели первого этапа
+        model = self._model
+        problem = model.problem
+        used_items = model.used_items
+        # Значения первого этапа - начальное решение второго
+        incumbent = model.solution()
+        incumbent_used = [lp.value(used) or 0 for used in used_items]
 
         # ЧЕТВЕРТОЕ ОГРАНИЧЕНИЕ
-        total_waste = 0
-        for i in range(len(self._patterns)):
-            row_sum = 0
-            for j in range(len(self._patterns[i])):
-                total_waste += self._patterns[i][j].waste * x[i][j]
-        problem += total_waste == min_waste
+        model.add_constraint(model.total_waste == min_waste, "min_waste")
 
         # ЦЕЛЕВАЯ ФУНКЦИЯ
-        used_items = [lp.lpSum(x[i]) for i in range(len(x))]
-        # Находим все возможные пары использованных заготовок (в индексах)
-        pairs = combinations(range(len(used_items)), 2)
-        distances = []
-        for i, j in pairs:
-            d = lp.LpVariable(f"d{i}{j}")
-            distances.append(d)
-            # Дистанция: |x1 - x2|, но модуль нелинейная функция
-            # |x1 - x2| = max(x1 - x2, x2 - x1)
-            # Т.к. мы минимизируем функцию, d = max(x1 - x2, x2 - x1)
-            problem += d >= used_items[i] - used_items[j]
-            problem += d >= used_items[j] - used_items[i]
-
-        avg_distance = lp.lpSum(distances) / len(used_items)
-        problem += avg_distance
+        model.set_objective(self._make_uniformity_objective(model, incumbent_used))
 
         # РЕШЕНИЕ
-        status = problem.solve()
+        with self._timed("uniform"):
+            status = model.solve(warm_start=True, on_incumbent=self._incumbent_callback(uniform=True))
 
         # ВЫВОД ЗНАЧЕНИЙ
-        if status == lp.LpStatusOptimal:
-            print(f"Problem is solved!")
-            print(f"Waste: {min_waste}")
-            print(f"Used pieces: {used_items}")
-            print(f"Mean distance: {lp.value(problem.objective)}")
-        elif lp.LpStatus[problem.status] == lp.LpStatusInfeasible:
-            print(f"No solution found!")
-            return -1
-
-        # ВЫВОД В ПОНЯТНОМ ФОРМАТЕ
+        self._stats["uniform_status"] = lp.LpSolution[status]
+        if status in (lp.LpSolutionOptimal, lp.LpSolutionIntegerFeasible):
+            logger.debug("stage 2 solved (%s), waste: %s, uniformity (%s): %s",
+                         lp.LpSolution[status], min_waste, self._uniformity, lp.value(problem.objective))
+            used_patterns = model.solution()
+        else:
+            # Решение первого этапа удовлетворяет всем ограничениям второго,
+            # поэтому используем его, если второй этап не дал решения
+            logger.warning("no uniform solution found (%s), using stage 1 solution", lp.LpSolution[status])
+            used_patterns = incumbent
+        self._used_patterns = used_patterns
+
+        with self._timed("format"):
+            self._stats["used_stock"] = self._count_used_stock(self._patterns, used_patterns).tolist()
+            return self._format_solution(used_patterns, min_waste)
+
+    def _count_used_stock(self, patterns, used_patterns):
+        """Количество использованных заготовок каждой длины"""
+        return np.bincount(patterns.stock_index, weights=used_patterns,
+                           minlength=len(self._stock_lengths)).astype(int)
+
+    def _format_solution(self, used_patterns, min_waste, patterns=None):
+        """
+        Выводит решение в понятном формате: схема раскроя, отходы и оценки.
+        patterns - комбинации, к которым относится used_patterns (по умолчанию self._patterns).
+        """
+        if patterns is None:
+            patterns = self._patterns
+        # Количество используемых заготовок
+        used_stock = self._count_used_stock(patterns, used_patterns)
         output = "СХЕМА РАСКРОЯ ЗАГОТОВОК:\n\n"
-        for i in range(len(x)):
-            l = self._stock_lengths[i]
-            cur_used = lp.value(used_items[i])
-            if isinstance(cur_used, (int, float)) and cur_used > 0:
+        stock_rows = patterns.rows_by_stock(len(self._stock_lengths))
+        for i, l in enumerate(self._stock_lengths):
+            if used_stock[i] > 0:
                 output += f"Заготовка {l} м:\n"
-            for j in range(len(x[i])):
-                combination_qty = int(lp.value(x[i][j])) # Количество используемой комбинации
-                print(f"x{i}{j} = {combination_qty}; item: {self._stock_lengths[i]}")
-                if combination_qty > 0:
-                    combination = self._make_str_combination(self._patterns[i][j])
-                    cur_waste = self._patterns[i][j].waste
-                    cur_waste = self._clean_float(cur_waste) # Преобразуем в читаемый формат
-                    output += f"План раскроя: {combination} | Обрезок: {cur_waste} м\n"
-                    output += f"Количество повторений: {combination_qty}\n\n"
-        min_waste = self._clean_float(min_waste) # Преобразуем в читаемый формат
-        output += f"Общие отходы: {min_waste} м "
+            rows = stock_rows[i]
+            for p in rows[used_patterns[rows] > 0]:
+                combination_qty = int(used_patterns[p]) # Количество используемой комбинации
+                combination = self._make_str_combination(patterns.counts[p])
+                cur_waste = self._to_meters(patterns.waste[p]) # Преобразуем в метры
+                output += f"План раскроя: {combination} | Обрезок: {cur_waste} м\n"
+                output += f"Количество повторений: {combination_qty}\n\n"
+        output += f"Общие отходы: {self._to_meters(min_waste)} м "
         if min_waste > 0:
-            total_used_length = sum(self._stock_lengths[i] * lp.value(used_items[i]) 
-                                    for i in range(len(self._stock_lengths)))
-            waste_part = min_waste / total_used_length * 100
+            total_used_length = float(np.dot(self._stock_lengths, used_stock))
+            waste_part = min_waste * self._resolution / total_used_length * 100
             output += f"({waste_part:.2f}% от использованной длины)"
+        if self._kerf or self._trim:
+            output += (f"\nУчтены пропил {self._to_meters(self._kerf)} м "
+                       f"и торцовка {self._to_meters(self._trim)} м на заготовку")
+        if self._waste_bound is not None:
+            waste_bound = self._to_meters(self._waste_bound)
+            output += (f"\nРешатель остановлен до доказательства оптимальности, "
+                       f"нижняя оценка отходов: {waste_bound} м")
+        if self._lp_bound is not None:
+            lp_bound = self._to_meters(self._lp_bound)
+            gap = max(min_waste - self._lp_bound, 0)
+            output += f"\nНижняя оценка отходов (LP): {lp_bound} м, разрыв: {self._to_meters(gap)} м"
+            if min_waste > 0:
+                output += f" ({gap / min_waste * 100:.2f}%)"
 
         return output
     
-    def _make_str_combination(self, cur_pattern):
+    def _make_uniformity_objective(self, model, incumbent_used):
+        """
+        Добавляет в модель вспомогательные переменные и возвращает целевую функцию
+        равномерности использования заготовок used_items.
+        Начальные значения переменных считаются по решению первого этапа (incumbent_used).
+
+        pairwise: средняя дистанция между всеми парами заготовок,
+            d_ij >= |used_i - used_j|, k(k-1)/2 переменных.
+        spread: max(used) - min(used),
+            u_max >= used_i, u_min <= used_i, 2 переменные.
+        mean: среднее отклонение от среднего использования,
+            d_i >= |used_i - mean|, k + 1 переменная.
+        """
+        used_items = model.used_items
+        k = len(used_items)
+
+        if self._uniformity == "spread":
+            u_max = lp.LpVariable("u_max")
+            u_min = lp.LpVariable("u_min")
+            u_max.setInitialValue(max(incumbent_used))
+            u_min.setInitialValue(min(incumbent_used))
+            for used in used_items:
+                model.add_constraint(u_max >= used)
+                model.add_constraint(u_min <= used)
+            return u_max - u_min
+
+        if self._uniformity == "mean":
+            # Среднее - отдельная переменная с одним ограничением-равенством:
+            # иначе каждое из 2k ограничений ссылается на все комбинации
+            incumbent_mean = sum(incumbent_used) / k
+            mean = lp.LpVariable("mean")
+            mean.setInitialValue(incumbent_mean)
+            model.add_constraint(k * mean == lp.lpSum(used_items))
+            deviations = []
+            for i, used in enumerate(used_items):
+                d = lp.LpVariable(f"d{i}")
+                d.setInitialValue(abs(incumbent_used[i] - incumbent_mean))
+                deviations.append(d)
+                # |used - mean| = max(used - mean, mean - used)
+                model.add_constraint(d >= used - mean)
+                model.add_constraint(d >= mean - used)
+            return lp.lpSum(deviations) / k
+
+        # Находим все возможные пары использованных заготовок (в индексах)
+        pairs = combinations(range(k), 2)
+        distances = []
+        for i, j in pairs:
+            d = lp.LpVariable(f"d{i}_{j}")
+            d.setInitialValue(abs(incumbent_used[i] - incumbent_used[j]))
+            distances.append(d)
+            # Дистанция: |x1 - x2|, но модуль нелинейная функция
+            # |x1 - x2| = max(x1 - x2, x2 - x1)
+            # Т.к. мы минимизируем функцию, d = max(x1 - x2, x2 - x1)
+            model.add_constraint(d >= used_items[i] - used_items[j])
+            model.add_constraint(d >= used_items[j] - used_items[i])
+        return lp.lpSum(distances) / k
+
+    def _make_str_combination(self, piece_quantities):
         quantities_to_print = []
         demand_to_use = []
-        for l, qty in zip(self._demand_lengths, cur_pattern.piece_quantities):
+        for l, qty in zip(self._demand_lengths, piece_quantities.tolist()):
             if qty == 0:
                 continue
             quantities_to_print.append(qty)
@@ -386,15 +990,3 @@ class Solver:
                 combination += f"{demand_len} x {qty} + "
         combination += ']'
         return combination
-    
-    def _clean_float(self, num, max_precision=15):
-        """
-        Находит минимальную точность, убирает лишние цифры.
-        Пример: 0.33999999999999986 -> 0.34
-        """
-        for precision in range(1, max_precision + 1):
-            rounded = round(num, precision)
-            if abs(num - rounded) < 1e-10:
-                return rounded
-        return round(num, max_precision)
-    
\ No newline at end of file
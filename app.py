@@ -1,7 +1,58 @@
-from flask import Flask, render_template, request, jsonify
+import json
+import logging
+import math
+import os
+from flask import Flask, Response, render_template, request, jsonify
 from algorithm import Solver
+from cache import ResultCache
+from patterns import MAX_PATTERNS, pattern_cache
+from jobs import JobQueue, QueueFull, ACCEPTED, FINISHED
+from batch import solve_many, order_input, DONE, NO_SOLUTION
+from metrics import Metrics
+
+# Уровень логов: DEBUG выводит комбинации и значения переменных (медленно на больших заказах)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING"),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 app = Flask(__name__)
+# Ограничения решателя на каждый этап, чтобы один тяжёлый заказ не занимал воркер бесконечно
+app.config["SOLVER_OPTIONS"] = {
+    "time_limit": float(os.environ.get("SOLVER_TIME_LIMIT", 30)),
+    "gap": float(os.environ["SOLVER_GAP"]) if "SOLVER_GAP" in os.environ else None,
+    "threads": int(os.environ["SOLVER_THREADS"]) if "SOLVER_THREADS" in os.environ else None,
+    "backend": os.environ.get("SOLVER_BACKEND", "cbc"),
+    # Единица длины в метрах, в которой считаются комбинации (0.001 - миллиметры)
+    "resolution": float(os.environ.get("LENGTH_RESOLUTION", 0.001)),
+    # Наибольшее число комбинаций точного расчёта: больший перебор может не поместиться в память воркера
+    "max_patterns": int(os.environ.get("SOLVER_MAX_PATTERNS", MAX_PATTERNS)),
+}
+# Кэш результатов по каноническому заказу. RESULT_CACHE_PATH - файл SQLite,
+# чтобы кэш переживал перезапуск и был общим для воркеров gunicorn
+result_cache = ResultCache(
+    max_size=int(os.environ.get("RESULT_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", 3600)),
+    path=os.environ.get("RESULT_CACHE_PATH"),
+)
+# Очередь задач для долгих решений: POST /jobs, затем поток событий GET /jobs/<id>/events
+# (или опрос GET /jobs/<id>). Задачи хранятся в памяти процесса, а поток событий занимает
+# поток на всё время решения, поэтому приложение запускается одним воркером gunicorn
+# с потоками (gunicorn.conf.py, раздел "Запуск на сервере" в README.md)
+job_queue = JobQueue(
+    workers=int(os.environ["JOB_WORKERS"]) if "JOB_WORKERS" in os.environ else None,
+    max_queue=int(os.environ.get("JOB_MAX_QUEUE", 100)),
+    timeout=float(os.environ.get("JOB_TIMEOUT", 300)),
+    on_finish=lambda job: _job_finished(job),
+)
+# Метрики решений для GET /metrics
+metrics = Metrics()
+# Планы последних решений по сеансам страницы (поле формы session): следующее
+# решение изменённого заказа стартует с плана предыдущего, см. session.SolveSession
+session_plans = ResultCache(
+    max_size=int(os.environ.get("SESSION_MAX", 1000)),
+    ttl=float(os.environ.get("SESSION_TTL", 3600)),
+)
+# Ограничение на размер пакета POST /batch
+app.config["BATCH_MAX_ORDERS"] = int(os.environ.get("BATCH_MAX_ORDERS", 1000))
 
 @app.route('/')
 def index():
@@ -10,23 +61,241 @@ def index():
 @app.route("/process", methods=['POST'])
 def process():
     user_input = request.form
-    print(f"input: {user_input}")
+    app.logger.debug("input: %s", user_input)
 
     error_message = _validate_input(user_input)
     if error_message:
         return jsonify({'result': error_message})
 
-    solver = Solver(user_input)
-    
-    result = solver.solve()
-    print(f"result: {result}")
-    
-    return jsonify({'result': result})
+    solver = Solver(user_input, **_solver_options(user_input))
+
+    # Некорректный заказ не кэшируем: solve сразу вернёт сообщение об ошибке
+    key = solver.order_key()
+    result = result_cache.get(key) if key is not None else None
+    if result is None:
+        result = solver.solve()
+        metrics.observe(solver.stats, _outcome(solver.stats))
+        _save_plan(user_input, solver.plan())
+        if key is not None and _cacheable(solver.stats):
+            result_cache.set(key, result)
+    else:
+        metrics.observe({}, "cached")
+    app.logger.debug("result: %s", result)
+
+    response = {'result': result}
+    if _debug_requested():
+        response['stats'] = solver.stats
+    return jsonify(response)
+
+@app.route("/jobs", methods=['POST'])
+def submit_job():
+    user_input = request.form
+
+    error_message = _validate_input(user_input)
+    if error_message:
+        return jsonify({'status': 'done', 'result': error_message})
+
+    options = _solver_options(user_input)
+    solver = Solver(user_input, **options)
+    key = solver.order_key()
+    if key is None:
+        # Ошибка в данных: сообщение получаем сразу, без очереди
+        return jsonify({'status': 'done', 'result': solver.solve()})
+    result = result_cache.get(key)
+    if result is not None:
+        metrics.observe({}, "cached")
+        return jsonify({'status': 'done', 'result': result})
+    if options.get("mode") == "heuristic":
+        # Быстрый расчёт занимает доли секунды, очередь для него не нужна
+        result = solver.solve()
+        metrics.observe(solver.stats, _outcome(solver.stats))
+        _save_plan(user_input, solver.plan())
+        if _cacheable(solver.stats):
+            result_cache.set(key, result)
+        response = {'status': 'done', 'result': result}
+        if _debug_requested():
+            response['stats'] = solver.stats
+        return jsonify(response)
+
+    try:
+        job = job_queue.submit(key, user_input, options)
+    except QueueFull:
+        return jsonify({'status': 'failed', 'error': "Сервер перегружен, попробуйте позже"}), 429
+    return jsonify(job.to_dict(_debug_requested())), 202
+
+@app.route("/jobs/<job_id>", methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': "Задача не найдена"}), 404
+    return jsonify(job.to_dict(_debug_requested()))
+
+@app.route("/jobs/<job_id>/events", methods=['GET'])
+def job_events(job_id):
+    """
+    Поток событий задачи (Server-Sent Events): при каждом изменении задачи
+    (этап, количество найденных комбинаций, новое промежуточное решение, завершение)
+    отправляется её состояние в том же виде, что и GET /jobs/<id>.
+    Поток закрывается после завершения задачи.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': "Задача не найдена"}), 404
+    debug = _debug_requested()
+
+    def stream():
+        version = None
+        current = job
+        while current is not None:
+            if current.version == version:
+                # Комментарий SSE: не даёт прокси закрыть соединение без событий
+                yield ": keep-alive\n\n"
+            else:
+                version = current.version
+                state = current.to_dict(debug)
+                yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+                # Статус берётся из отправленного состояния: пока поток ждал
+                # отправки, задача могла завершиться, и это состояние ещё нужно отправить
+                if state["status"] in FINISHED:
+                    return
+            current = job_queue.wait(job_id, version, timeout=15)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/jobs/<job_id>/accept", methods=['POST'])
+def accept_job(job_id):
+    """Останавливает расчёт и принимает лучшее промежуточное решение"""
+    if not job_queue.accept(job_id):
+        return jsonify({'error': "Задача не найдена, уже завершена или ещё не нашла решения"}), 404
+    return jsonify(job_queue.get(job_id).to_dict(_debug_requested()))
+
+@app.route("/jobs/<job_id>", methods=['DELETE'])
+def cancel_job(job_id):
+    if not job_queue.cancel(job_id):
+        return jsonify({'error': "Задача не найдена или уже завершена"}), 404
+    return jsonify(job_queue.get(job_id).to_dict(_debug_requested()))
+
+@app.route("/batch", methods=['POST'])
+def batch():
+    """
+    Пакетное решение заказов: {"orders": [заказ, ...]}, формат заказа - см. batch.solve_many.
+    Ответ: {"results": [...]} в порядке заказов, статистика решения - только с ?debug=1.
+    """
+    data = request.get_json(silent=True)
+    orders = data.get("orders") if isinstance(data, dict) else None
+    if not isinstance(orders, list) or not all(isinstance(order, dict) for order in orders):
+        return jsonify({'error': "Ожидается JSON вида {\"orders\": [...]}"}), 400
+    if len(orders) > app.config["BATCH_MAX_ORDERS"]:
+        return jsonify({'error': f"Не больше {app.config['BATCH_MAX_ORDERS']} заказов в пакете"}), 413
+
+    # Уже решённые заказы берём из кэша, остальные решаем в пуле процессов
+    results = [None] * len(orders)
+    keys = [None] * len(orders)
+    for n, order in enumerate(orders):
+        try:
+            keys[n] = Solver(order_input(order), **app.config["SOLVER_OPTIONS"]).order_key()
+        except Exception:
+            continue  # ошибка в данных (в том числе inf и слишком большие числа), её сообщит solve_many
+        cached = result_cache.get(keys[n]) if keys[n] is not None else None
+        if cached is not None:
+            results[n] = {"status": DONE, "result": cached, "error": None, "time": 0.0, "stats": {}}
+            metrics.observe({}, "cached")
+
+    pending = [n for n, result in enumerate(results) if result is None]
+    solved = solve_many([orders[n] for n in pending], **app.config["SOLVER_OPTIONS"])
+    for n, result in zip(pending, solved):
+        results[n] = result
+        metrics.observe(result["stats"], result["status"])
+        if keys[n] is not None and _cacheable(result["stats"]):
+            result_cache.set(keys[n], result["result"])
+    if not _debug_requested():
+        for result in results:
+            del result["stats"]
+    return jsonify({'results': results})
+
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify({"results": result_cache.stats(), "patterns": pattern_cache.stats()})
+
+@app.route("/metrics")
+def prometheus_metrics():
+    gauges = [
+        ("cutter_result_cache", "Кэш результатов",
+         {(("value", name),): value for name, value in result_cache.stats().items()}),
+        ("cutter_pattern_cache", "Кэш комбинаций",
+         {(("value", name),): value for name, value in pattern_cache.stats().items()}),
+        ("cutter_jobs", "Задачи в очереди по статусу",
+         {(("status", status),): count for status, count in job_queue.stats().items()}),
+    ]
+    return metrics.render(gauges), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+def _job_finished(job):
+    if job.status == DONE:
+        if _cacheable(job.stats):
+            result_cache.set(job.key, job.result)
+        _save_plan(job.user_input, job.plan)
+        metrics.observe(job.stats, _outcome(job.stats))
+    elif job.status == ACCEPTED:
+        # Промежуточное решение не кэшируем: точный расчёт того же заказа может дать лучше,
+        # но следующее решение в сеансе стартует с него
+        _save_plan(job.user_input, job.plan)
+        metrics.observe(job.stats, job.status)
+    else:
+        metrics.observe(job.stats, job.status)
+
+def _outcome(stats):
+    """Исход решения по Solver.stats: раскрой найден или нет"""
+    return DONE if "used_stock" in stats else NO_SOLUTION
+
+def _cacheable(stats):
+    """
+    Кэшируется только найденный раскрой с доказанным результатом: без остановки
+    по лимиту времени или gap (min_waste_bound) и без подстановки эвристического плана.
+    Иначе повторный заказ, например при меньшей нагрузке, может получить лучший раскрой.
+    """
+    return ("used_stock" in stats and "min_waste_bound" not in stats
+            and not stats.get("heuristic_fallback"))
+
+def _debug_requested():
+    """Флаг ?debug=1: добавить в ответ статистику решения (время этапов, размер модели, статусы)"""
+    return request.args.get("debug", "").lower() in ("1", "true", "yes")
+
+def _solver_options(user_input):
+    """
+    Параметры решателя: настройки сервера, режим расчёта из формы (поле mode),
+    пропил и торцовка из формы (поля kerf и trim, в миллиметрах)
+    и план предыдущего решения в том же сеансе (поле session) для старта решателя.
+    """
+    options = dict(app.config["SOLVER_OPTIONS"])
+    if user_input.get("mode"):
+        options["mode"] = user_input["mode"]
+    for field in ("kerf", "trim"):
+        if user_input.get(field):
+            options[field] = float(user_input[field]) / 1000
+    if user_input.get("session"):
+        options["warm_start"] = session_plans.get(user_input["session"])
+    return options
+
+def _save_plan(user_input, plan):
+    if user_input.get("session") and plan is not None:
+        session_plans.set(user_input["session"], plan)
 
 def _validate_input(user_input):
     for key, value in user_input.items():
         if len(value) == 0:
             return "Заполните все поля!"
+    if user_input.get("mode") and user_input["mode"] not in Solver.MODES:
+        return "Неизвестный режим расчёта"
+    for field in ("kerf", "trim"):
+        if field not in user_input:
+            continue
+        try:
+            value = float(user_input[field])
+        except ValueError:
+            value = -1
+        if not math.isfinite(value) or value < 0:
+            return "Пропил и торцовка должны быть неотрицательными числами"
     return None
 
 if __name__ == '__main__':
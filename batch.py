@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from algorithm import Solver
+
+# Статусы заказа в пакете
+DONE = "done"              # раскрой найден
+NO_SOLUTION = "no_solution"  # ошибка в данных, раскрой невозможен или не найден за отведённое время
+FAILED = "failed"          # непредвиденная ошибка при решении
+
+
+def solve_many(orders, processes=None, **solver_options):
+    """
+    Решает пакет заказов параллельно в пуле процессов.
+
+    Заказ - словарь в формате формы (stock_len1, stock_qty1, demand_len1, ...)
+    или в виде списков пар (длина, количество):
+        {"stock": [[6, 10], [12, 5]], "demand": [[1.5, 4], [2.3, 8]]}
+
+    Параметры:
+        processes - размер пула (по умолчанию количество ядер).
+        solver_options - параметры Solver (mode, uniformity, time_limit, ...).
+
+    Возвращает список в порядке заказов, для каждого заказа словарь
+    {"status", "result", "error", "time", "stats"}: ошибка в одном заказе
+    не прерывает пакет. stats - статистика решения (Solver.stats).
+    """
+    orders = list(orders)
+    if not orders:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(orders))
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        # Процессы пула живут весь пакет, поэтому кэш комбинаций
+        # (patterns.pattern_cache) общий для заказов, решаемых в одном процессе
+        futures = [executor.submit(_solve_order, order, solver_options) for order in orders]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # Процесс пула завершился аварийно (например, по нехватке памяти):
+                # BrokenProcessPool получают этот и все ещё не решённые заказы
+                results.append({"status": FAILED, "result": None, "error": f"{type(e).__name__}: {e}",
+                                "time": time.perf_counter() - start, "stats": {}})
+        return results
+
+
+def order_input(order):
+    """Приводит заказ к формату формы, который принимает Solver"""
+    if "stock" not in order and "demand" not in order:
+        return order
+    user_input = {}
+    for prefix in ("stock", "demand"):
+        for n, (length, quantity) in enumerate(order.get(prefix, []), start=1):
+            user_input[f"{prefix}_len{n}"] = length
+            user_input[f"{prefix}_qty{n}"] = quantity
+    return user_input
+
+
+def _solve_order(order, solver_options):
+    start = time.perf_counter()
+    try:
+        solver = Solver(order_input(order), **solver_options)
+        result = solver.solve()
+    except Exception as e:
+        return {"status": FAILED, "result": None, "error": f"{type(e).__name__}: {e}",
+                "time": time.perf_counter() - start, "stats": {}}
+    elapsed = time.perf_counter() - start
+    if "used_stock" not in solver.stats:
+        return {"status": NO_SOLUTION, "result": None, "error": result, "time": elapsed,
+                "stats": solver.stats}
+    return {"status": DONE, "result": result, "error": None, "time": elapsed, "stats": solver.stats}
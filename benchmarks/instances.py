@@ -0,0 +1,122 @@
+"""
+Генератор заказов для замеров (с фиксированным seed, поэтому воспроизводимый).
+
+Заказ - словарь в формате формы, который принимает Solver:
+stock_len1, stock_qty1, ..., demand_len1, demand_qty1, ...
+
+Наборы заказов (suite):
+    quick - небольшие случайные заказы, для быстрой проверки;
+    scaling - растущее количество длин заготовок и отрезков;
+    cutgen - классы генератора CUTGEN1 (Gau, Wäscher, 1995), стандартного
+    для литературы по задаче раскроя: одна длина заготовки, длины отрезков
+    в диапазоне [v1 * L, v2 * L], средний спрос d на каждую длину;
+    cutgen-large - классы CUTGEN1 с короткими отрезками (очень много комбинаций).
+"""
+import random
+
+# Классы CUTGEN1: (количество длин отрезков m, v1, v2, средний спрос d)
+CUTGEN_CLASSES = {
+    1: (10, 0.01, 0.2, 10),
+    2: (10, 0.01, 0.2, 100),
+    3: (20, 0.01, 0.2, 10),
+    4: (20, 0.01, 0.2, 100),
+    5: (40, 0.01, 0.2, 10),
+    6: (40, 0.01, 0.2, 100),
+    7: (10, 0.01, 0.8, 10),
+    8: (10, 0.01, 0.8, 100),
+    9: (20, 0.01, 0.8, 10),
+    10: (20, 0.01, 0.8, 100),
+    11: (40, 0.01, 0.8, 10),
+    12: (40, 0.01, 0.8, 100),
+    13: (10, 0.2, 0.8, 10),
+    14: (10, 0.2, 0.8, 100),
+    15: (20, 0.2, 0.8, 10),
+    16: (20, 0.2, 0.8, 100),
+    17: (40, 0.2, 0.8, 10),
+    18: (40, 0.2, 0.8, 100),
+}
+
+
+def make_input(stock, demand):
+    """Заказ в формате формы из списков пар (длина, количество)"""
+    user_input = {}
+    for prefix, rows in (("stock", stock), ("demand", demand)):
+        for n, (length, quantity) in enumerate(rows, start=1):
+            user_input[f"{prefix}_len{n}"] = str(length)
+            user_input[f"{prefix}_qty{n}"] = str(quantity)
+    return user_input
+
+
+def random_order(n_stock, n_demand, rng, ratio=(2, 12), max_qty=6, stock_qty=(5, 20)):
+    """
+    Случайный заказ: n_stock длин заготовок от 2 до 12 м и n_demand длин отрезков.
+
+    ratio - диапазон отношения длины заготовки к длине отрезка
+    (чем больше, тем больше отрезков в комбинации и тем больше комбинаций).
+    max_qty - наибольшее заказанное количество одного отрезка.
+    stock_qty - диапазон количества каждой заготовки на складе.
+    """
+    stock_lengths = [length / 10 for length in rng.sample(range(20, 121), n_stock)]
+    shortest = min(stock_lengths)
+    low = max(int(shortest / ratio[1] * 100), 1)
+    high = max(int(shortest / ratio[0] * 100), low + n_demand)
+    demand_lengths = [length / 100 for length in rng.sample(range(low, high + 1), n_demand)]
+    stock = [(length, rng.randint(*stock_qty)) for length in stock_lengths]
+    demand = [(length, rng.randint(1, max_qty)) for length in demand_lengths]
+    return make_input(stock, demand)
+
+
+def cutgen_order(cls, rng, stock_len=6.0):
+    """
+    Заказ класса CUTGEN1 cls для заготовки длины stock_len (в метрах, длины отрезков
+    округлены до сантиметра). Количество заготовок на складе - с запасом 50%.
+    """
+    m, v1, v2, d = CUTGEN_CLASSES[cls]
+    low = max(round(v1 * stock_len * 100), 1)
+    high = round(v2 * stock_len * 100)
+    lengths = sorted(set(rng.randint(low, high) / 100 for _ in range(m)))
+
+    # Как в CUTGEN1: общий спрос m * d распределяется между длинами случайными долями
+    weights = [rng.random() for _ in lengths]
+    total = d * len(lengths)
+    quantities = [max(round(total * w / sum(weights)), 1) for w in weights]
+
+    total_length = sum(l * q for l, q in zip(lengths, quantities))
+    stock = [(stock_len, int(total_length / stock_len * 1.5) + 1)]
+    return make_input(stock, list(zip(lengths, quantities)))
+
+
+def suite(name, seed=0, size=None):
+    """
+    Возвращает список (имя заказа, параметры, заказ) набора name.
+    size ограничивает количество заказов (или классов CUTGEN) в наборе.
+    """
+    # У каждого заказа свой генератор, чтобы заказ не менялся при изменении состава набора
+    def rng(order_name):
+        return random.Random(f"{seed}:{order_name}")
+
+    orders = []
+    if name == "quick":
+        for n_stock, n_demand in [(1, 3), (2, 3), (3, 4), (2, 5), (5, 3)]:
+            params = {"n_stock": n_stock, "n_demand": n_demand}
+            order_name = f"quick-{n_stock}x{n_demand}"
+            orders.append((order_name, params, random_order(n_stock, n_demand, rng(order_name))))
+    elif name == "scaling":
+        for n_stock, n_demand in [(1, 4), (2, 4), (5, 4), (10, 4), (20, 4), (2, 6), (2, 8)]:
+            params = {"n_stock": n_stock, "n_demand": n_demand}
+            order_name = f"scaling-{n_stock}x{n_demand}"
+            orders.append((order_name, params,
+                           random_order(n_stock, n_demand, rng(order_name), max_qty=10)))
+    elif name in ("cutgen", "cutgen-large"):
+        # Классы, для которых полный перебор даёт сотни тысяч комбинаций,
+        # вынесены в отдельный набор cutgen-large
+        classes = (13, 14, 15, 16, 17, 18, 7, 8, 10) if name == "cutgen" else (1, 2, 9, 11, 12)
+        for cls in classes:
+            order_name = f"cutgen-{cls}"
+            orders.append((order_name, {"class": cls}, cutgen_order(cls, rng(order_name))))
+    else:
+        raise ValueError(f"Unknown suite: {name}")
+    return orders[:size] if size else orders
+
+
+SUITES = ("quick", "scaling", "cutgen", "cutgen-large")
@@ -0,0 +1,184 @@
+"""
+Замер производительности Solver на наборах заказов из benchmarks.instances.
+
+Для каждого заказа записываются: общее время, время этапов (Solver.stats["timings"]),
+пиковая память Python (tracemalloc, без памяти процесса CBC), количество комбинаций,
+размер модели (переменные и ограничения), статусы решателя и найденный остаток.
+Результаты сохраняются в JSON, два таких файла можно сравнить.
+
+Запуск из корня проекта:
+    python -m benchmarks.solver --suite quick cutgen --out before.json
+    python -m benchmarks.solver --suite quick cutgen --out after.json
+    python -m benchmarks.solver --compare before.json after.json
+
+При сравнении регрессией считается рост времени или памяти больше чем на
+--threshold (и больше чем на --min-time секунд для времени), рост остатка
+или изменение исхода решения. Код возврата 1, если есть регрессии.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pulp as lp
+
+from algorithm import Solver
+from patterns import pattern_cache
+from benchmarks.instances import SUITES, suite
+
+
+def run_order(user_input, options, measure_memory=True, repeat=1):
+    """
+    Решает заказ repeat раз (каждый раз с пустым кэшем комбинаций)
+    и возвращает показатели лучшего по времени запуска.
+    """
+    best = None
+    for _ in range(repeat):
+        pattern_cache.clear()
+        if measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            solver = Solver(user_input, **options)
+            solver.solve()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        wall_time = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1] if measure_memory else None
+        if measure_memory:
+            tracemalloc.stop()
+        if best is not None and wall_time >= best["wall_time"]:
+            continue
+
+        stats = solver.stats if error is None else {}
+        if error is not None:
+            outcome = "failed"
+        else:
+            outcome = "done" if "used_stock" in stats else "no_solution"
+        best = {
+            "outcome": outcome,
+            "error": error,
+            "wall_time": wall_time,
+            "peak_memory": peak_memory,
+            "timings": stats.get("timings", {}),
+            "patterns": stats.get("patterns"),
+            "variables": stats.get("variables"),
+            "constraints": stats.get("constraints"),
+            "waste": stats.get("waste"),
+            "min_waste_status": stats.get("min_waste_status"),
+            "uniform_status": stats.get("uniform_status"),
+        }
+    return best
+
+
+def run(args):
+    options = {"mode": args.mode, "uniformity": args.uniformity, "time_limit": args.time_limit}
+    results = []
+    for suite_name in args.suite:
+        for name, params, user_input in suite(suite_name, seed=args.seed, size=args.size):
+            record = run_order(user_input, options, not args.no_memory, args.repeat)
+            record.update(name=name, suite=suite_name, params=params)
+            results.append(record)
+            memory = f"{record['peak_memory'] / 2**20:8.1f}" if record["peak_memory"] is not None else f"{'-':>8}"
+            print(f"{name:<16} {record['outcome']:<11} {record['wall_time']:8.2f} {memory} "
+                  f"{record['patterns'] or 0:>9} {record['variables'] or 0:>9} {_format(record['waste'])}",
+                  flush=True)
+
+    data = {"meta": _meta(options, args), "results": results}
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=1)
+    print(f"Результаты записаны в {args.out}")
+
+
+def compare(old_path, new_path, threshold, min_time):
+    """Сравнивает два файла результатов, печатает изменения и возвращает количество регрессий"""
+    with open(old_path, encoding="utf-8") as file:
+        old = {record["name"]: record for record in json.load(file)["results"]}
+    with open(new_path, encoding="utf-8") as file:
+        new = {record["name"]: record for record in json.load(file)["results"]}
+
+    regressions = 0
+    print(f"{'order':<16} {'time, s':>18} {'memory, MiB':>18} {'patterns':>18} {'waste':>22}")
+    for name, after in new.items():
+        before = old.get(name)
+        if before is None:
+            print(f"{name:<16} нет в {old_path}")
+            continue
+        problems = []
+        if after["outcome"] != before["outcome"]:
+            problems.append(f"исход {before['outcome']} -> {after['outcome']}")
+        if (after["wall_time"] > before["wall_time"] * (1 + threshold)
+                and after["wall_time"] - before["wall_time"] > min_time):
+            problems.append("время")
+        if (after["peak_memory"] is not None and before["peak_memory"] is not None
+                and after["peak_memory"] > before["peak_memory"] * (1 + threshold)):
+            problems.append("память")
+        if after["waste"] is not None and before["waste"] is not None and after["waste"] > before["waste"] + 1e-6:
+            problems.append("остаток")
+        regressions += bool(problems)
+
+        print(f"{name:<16} {before['wall_time']:>7.2f} -> {after['wall_time']:<7.2f} "
+              f"{_mib(before['peak_memory']):>7} -> {_mib(after['peak_memory']):<7} "
+              f"{before['patterns'] or 0:>7} -> {after['patterns'] or 0:<7} "
+              f"{_format(before['waste']):>9} -> {_format(after['waste']):<9} "
+              f"{'РЕГРЕССИЯ: ' + ', '.join(problems) if problems else ''}")
+    print(f"Регрессий: {regressions}")
+    return regressions
+
+
+def _meta(options, args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pulp": lp.__version__,
+        "numpy": np.__version__,
+        "options": options,
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+
+
+def _format(value):
+    return f"{value:.3f}" if value is not None else "-"
+
+
+def _mib(value):
+    return f"{value / 2**20:.1f}" if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=["quick"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, help="не больше стольких заказов из каждого набора")
+    parser.add_argument("--repeat", type=int, default=1, help="запусков на заказ, берётся лучшее время")
+    parser.add_argument("--mode", choices=Solver.MODES, default="full")
+    parser.add_argument("--uniformity", choices=Solver.UNIFORMITY, default="pairwise")
+    parser.add_argument("--time-limit", type=float, default=60, help="лимит времени этапа решателя")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="не измерять память (tracemalloc замедляет построение модели)")
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="сравнить два файла результатов")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый относительный рост")
+    parser.add_argument("--min-time", type=float, default=0.05, help="допустимый рост времени в секундах")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold, args.min_time) else 0)
+    print(f"{'order':<16} {'outcome':<11} {'time, s':>8} {'MiB':>8} {'patterns':>9} {'variables':>9} waste")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
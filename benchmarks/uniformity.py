@@ -0,0 +1,87 @@
+"""
+Сравнение целевых функций равномерности второго этапа (Solver(uniformity=...)).
+
+Для каждого количества заготовок на складе генерируется случайный заказ,
+который решается со всеми вариантами uniformity. Сравниваются время второго
+этапа и получившееся распределение использованных заготовок.
+
+Запуск из корня проекта:
+    python -m benchmarks.uniformity
+    python -m benchmarks.uniformity --stock 5 10 20 40 --seed 1
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+from itertools import combinations
+
+from algorithm import Solver
+
+
+def make_order(n_stock, n_demand, rng):
+    """Случайный заказ: n_stock длин заготовок и n_demand длин отрезков"""
+    user_input = {}
+    stock_lengths = rng.sample(range(20, 121), n_stock)
+    for i, length in enumerate(stock_lengths, start=1):
+        user_input[f"stock_len{i}"] = str(length / 10)
+        user_input[f"stock_qty{i}"] = str(rng.randint(5, 20))
+    demand_lengths = rng.sample(range(5, min(stock_lengths)), n_demand)
+    for k, length in enumerate(demand_lengths, start=1):
+        user_input[f"demand_len{k}"] = str(length / 10)
+        user_input[f"demand_qty{k}"] = str(rng.randint(2, 6))
+    return user_input
+
+
+def distribution(used_stock):
+    """Показатели равномерности: размах, среднее отклонение от среднего, средняя дистанция"""
+    k = len(used_stock)
+    mean = sum(used_stock) / k
+    spread = max(used_stock) - min(used_stock)
+    deviation = sum(abs(used - mean) for used in used_stock) / k
+    pairwise = sum(abs(a - b) for a, b in combinations(used_stock, 2)) / k
+    return spread, deviation, pairwise
+
+
+@contextlib.contextmanager
+def quiet():
+    """Подавляет вывод решателя (в том числе вывод CBC из дочернего процесса)"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stock", type=int, nargs="+", default=[5, 10, 20, 30],
+                        help="количества длин заготовок")
+    parser.add_argument("--demand", type=int, default=3, help="количество длин отрезков")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'stock':>5} {'uniformity':>10} {'time, s':>8} {'spread':>7} {'deviation':>9} {'pairwise':>9}")
+    for n_stock in args.stock:
+        user_input = make_order(n_stock, args.demand, rng)
+        for uniformity in Solver.UNIFORMITY:
+            with quiet():
+                solver = Solver(user_input, uniformity=uniformity)
+                solver.solve()
+            stats = solver.stats
+            if "used_stock" not in stats:
+                print(f"{n_stock:>5} {uniformity:>10} {'нет решения':>8}")
+                continue
+            spread, deviation, pairwise = distribution(stats["used_stock"])
+            print(f"{n_stock:>5} {uniformity:>10} {stats['timings']['uniform']:>8.2f} "
+                  f"{spread:>7} {deviation:>9.2f} {pairwise:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов раскроя с ограничением по размеру и времени жизни записей.
+
+    Ключ - канонический ключ заказа (Solver.order_key), значение - результат Solver.solve.
+    По умолчанию записи хранятся в памяти процесса. Если указан path, используется
+    база SQLite: записи переживают перезапуск и общие для всех воркеров gunicorn.
+
+    Параметры:
+        max_size - максимальное количество записей, при превышении удаляются
+        давно не использованные.
+        ttl - время жизни записи в секундах (None - без ограничения).
+        path - путь к файлу базы SQLite для хранения на диске.
+    """
+
+    def __init__(self, max_size=256, ttl=3600, path=None):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._backend = _SqliteBackend(path) if path else _MemoryBackend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Возвращает сохранённый результат или None"""
+        with self._lock:
+            value = self._backend.get(_serialize(key), self._expired_before())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._backend.set(_serialize(key), value, self._max_size)
+
+    def clear(self):
+        with self._lock:
+            self._backend.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": self._backend.size()}
+
+    def _expired_before(self):
+        """Записи, созданные раньше этого момента, считаются устаревшими"""
+        return time.time() - self._ttl if self._ttl is not None else None
+
+
+class _MemoryBackend:
+    def __init__(self):
+        self._items = OrderedDict()  # ключ: (время создания, значение)
+
+    def get(self, key, expired_before):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        created, value = item
+        if expired_before is not None and created < expired_before:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key, value, max_size):
+        self._items[key] = (time.time(), value)
+        self._items.move_to_end(key)
+        while len(self._items) > max_size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def size(self):
+        return len(self._items)
+
+
+class _SqliteBackend:
+    def __init__(self, path):
+        self._path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Отдельное соединение на каждую операцию: объект кэша используется из разных потоков
+        connection = sqlite3.connect(self._path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key, expired_before):
+        with self._connect() as connection:
+            if expired_before is not None:
+                connection.execute("DELETE FROM results WHERE created < ?", (expired_before,))
+            row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+
+    def set(self, key, value, max_size):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now))
+            connection.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY accessed DESC LIMIT ?)", (max_size,))
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM results")
+
+    def size(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def _serialize(key):
+    return json.dumps(key)
@@ -0,0 +1,29 @@
+"""
+Настройки gunicorn: загружаются автоматически при запуске `gunicorn app:app`
+из корня проекта (см. раздел "Запуск на сервере" в README.md).
+
+Задачи очереди (jobs.JobQueue) хранятся в памяти процесса, принявшего POST /jobs,
+поэтому все запросы к задаче (GET /jobs/<id>, /events, /accept, DELETE) должны
+попадать в тот же процесс: приложение запускается одним воркером.
+Поток событий /jobs/<id>/events занимает поток воркера на всё время решения,
+поэтому воркер многопоточный (gthread). Сами решения идут в отдельных
+процессах (JOB_WORKERS), так что один воркер не ограничивает число ядер.
+"""
+import os
+
+workers = 1
+worker_class = "gthread"
+# Каждая открытая страница с идущим расчётом держит один поток
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+
+
+def on_starting(server):
+    """Не запускаться с настройками, при которых задачи теряются или поток событий блокирует воркер"""
+    if server.cfg.workers != 1:
+        raise RuntimeError(
+            "Очередь задач хранится в памяти процесса: запускайте один воркер (-w 1) "
+            "с потоками, для нескольких экземпляров нужна привязка клиента к экземпляру")
+    if server.cfg.worker_class_str == "sync" and server.cfg.threads < 2:
+        raise RuntimeError(
+            "Поток событий /jobs/<id>/events занимает поток на всё время решения: "
+            "нужен многопоточный воркер (-k gthread --threads N)")
@@ -0,0 +1,294 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from algorithm import Solver
+
+# Статусы задачи
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+ACCEPTED = "accepted"  # расчёт остановлен, принято промежуточное решение
+FINISHED = (DONE, FAILED, CANCELLED, TIMEOUT, ACCEPTED)
+
+
+class QueueFull(Exception):
+    """Очередь задач заполнена"""
+
+
+class Job:
+    """
+    Задача на раскрой: заказ, статус, последний прогресс, лучшее промежуточное
+    решение (incumbent, см. Solver(on_incumbent=...)) и результат.
+    version увеличивается при каждом изменении задачи (см. JobQueue.wait).
+    """
+
+    def __init__(self, key, user_input, options):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.user_input = user_input
+        self.options = options
+        self.status = QUEUED
+        self.progress = None
+        self.incumbent = None
+        self.version = 0
+        self.result = None
+        self.error = None
+        self.stats = {}
+        self.plan = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._process = None
+        self._connection = None
+
+    def to_dict(self, debug=False):
+        """Состояние задачи для ответа API; при debug=True добавляется статистика решения"""
+        end = self.finished or time.time()
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "incumbent": {"waste": self.incumbent["waste"], "result": self.incumbent["result"]}
+            if self.incumbent is not None else None,
+            "result": self.result,
+            "error": self.error,
+            "elapsed": end - (self.started or end),
+        }
+        if debug:
+            data["stats"] = self.stats
+        return data
+
+
+class JobQueue:
+    """
+    Очередь задач на раскрой с пулом процессов-решателей.
+
+    Каждая задача решается в отдельном процессе, поэтому её можно прервать
+    при отмене или по истечении времени. Одновременно выполняется не больше
+    workers задач, в очереди ожидает не больше max_queue задач.
+    Одинаковые заказы (по Solver.order_key), которые ещё выполняются или ждут,
+    не запускаются повторно: возвращается уже существующая задача.
+
+    Параметры:
+        workers - количество процессов-решателей.
+        max_queue - максимальное количество ожидающих задач.
+        timeout - лимит времени выполнения одной задачи в секундах.
+        keep_finished - сколько завершённых задач хранить для опроса.
+        on_finish - функция (job), вызывается для каждой завершённой задачи
+        (решённой, с ошибкой, отменённой, прерванной по времени или
+        остановленной с принятым промежуточным решением).
+    """
+
+    def __init__(self, workers=None, max_queue=100, timeout=300, keep_finished=1000, on_finish=None):
+        self._workers = workers or os.cpu_count() or 1
+        self._max_queue = max_queue
+        self._timeout = timeout
+        self._keep_finished = keep_finished
+        self._on_finish = on_finish
+        self._jobs = OrderedDict()  # id: Job
+        self._lock = threading.Lock()
+        # Оповещает ожидающих в wait об изменении любой задачи
+        self._changed = threading.Condition(self._lock)
+        self._thread = None
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+    def submit(self, key, user_input, options):
+        """Ставит заказ в очередь и возвращает задачу (или уже выполняющуюся такую же)"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and job.status in (QUEUED, RUNNING):
+                    return job
+            queued = sum(job.status == QUEUED for job in self._jobs.values())
+            if queued >= self._max_queue:
+                raise QueueFull()
+            job = Job(key, dict(user_input.items()), options)
+            self._jobs[job.id] = job
+            self._forget_finished()
+            self._start_thread()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Отменяет ожидающую или выполняющуюся задачу. Возвращает False, если задача уже завершена"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return False
+            self._finish(job, CANCELLED)
+            return True
+
+    def accept(self, job_id):
+        """
+        Останавливает выполняющуюся задачу и делает её результатом лучшее
+        промежуточное решение. Возвращает False, если задача уже завершена
+        или промежуточного решения ещё нет.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != RUNNING or job.incumbent is None:
+                return False
+            job.result = job.incumbent["result"]
+            job.plan = job.incumbent["plan"]
+            self._finish(job, ACCEPTED)
+            return True
+
+    def wait(self, job_id, version, timeout=None):
+        """
+        Ждёт изменения задачи (job.version != version) не дольше timeout секунд.
+        Возвращает задачу (возможно, не изменившуюся) или None, если её нет.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: job_id not in self._jobs
+                                   or self._jobs[job_id].version != version, timeout)
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def _start_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        """Запускает задачи из очереди, собирает прогресс и результаты, следит за временем"""
+        while True:
+            with self._lock:
+                running = [job for job in self._jobs.values() if job.status == RUNNING]
+                for job in running:
+                    self._poll(job)
+                running = [job for job in running if job.status == RUNNING]
+
+                for job in self._jobs.values():
+                    if len(running) >= self._workers:
+                        break
+                    if job.status == QUEUED:
+                        try:
+                            self._launch(job)
+                        except Exception as e:
+                            # Ошибка запуска одной задачи не должна останавливать очередь
+                            job.error = f"Не удалось запустить процесс решателя: {type(e).__name__}: {e}"
+                            self._finish(job, FAILED)
+                            continue
+                        running.append(job)
+
+                if not any(job.status in (QUEUED, RUNNING) for job in self._jobs.values()):
+                    self._thread = None
+                    return
+            time.sleep(0.1)
+
+    def _launch(self, job):
+        parent, child = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_run_job, args=(job.user_input, job.options, child), daemon=True)
+        try:
+            process.start()
+        except Exception:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        job._connection = parent
+        job._process = process
+        job.status = RUNNING
+        job.started = time.time()
+        self._touch(job)
+
+    def _poll(self, job):
+        try:
+            while job._connection.poll():
+                kind, payload = job._connection.recv()
+                self._touch(job)
+                if kind == "progress":
+                    job.progress = payload
+                elif kind == "incumbent":
+                    job.incumbent = payload
+                elif kind == "stats":
+                    job.stats = payload
+                elif kind == "plan":
+                    job.plan = payload
+                elif kind == "done":
+                    job.result = payload
+                    self._finish(job, DONE)
+                    return
+                elif kind == "error":
+                    job.error = payload
+                    self._finish(job, FAILED)
+                    return
+        except (EOFError, OSError):
+            job.error = "Процесс решателя неожиданно завершился"
+            self._finish(job, FAILED)
+            return
+        if time.time() - job.started > self._timeout:
+            job.error = f"Превышен лимит времени ({self._timeout} с)"
+            self._finish(job, TIMEOUT)
+
+    def _touch(self, job):
+        """Отмечает изменение задачи (вызывается под self._lock)"""
+        job.version += 1
+        self._changed.notify_all()
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        self._touch(job)
+        if job._process is not None:
+            if job._process.is_alive():
+                _terminate(job._process)
+            job._process.join(timeout=1)
+            job._connection.close()
+            job._process = job._connection = None
+        if self._on_finish is not None:
+            self._on_finish(job)
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(len(finished) - self._keep_finished, 0)]:
+            del self._jobs[job_id]
+
+
+def _terminate(process):
+    """Завершает процесс-решатель вместе с запущенным им процессом CBC"""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            return
+        except ProcessLookupError:
+            # Процесс ещё не успел создать свою группу (os.setsid в _run_job)
+            pass
+    process.terminate()
+
+
+def _run_job(user_input, options, connection):
+    """Решает заказ в процессе-решателе и отправляет прогресс и результат через connection"""
+    # Своя группа процессов, чтобы при отмене завершить и дочерний процесс CBC
+    if hasattr(os, "setsid"):
+        os.setsid()
+    try:
+        solver = Solver(user_input, progress=lambda event: connection.send(("progress", event)),
+                        on_incumbent=lambda incumbent: connection.send(("incumbent", incumbent)),
+                        **options)
+        result = solver.solve()
+        connection.send(("stats", solver.stats))
+        connection.send(("plan", solver.plan()))
+        connection.send(("done", result))
+    except Exception as e:
+        connection.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
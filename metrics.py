@@ -0,0 +1,110 @@
+import threading
+
+# Границы корзин гистограмм
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+SIZE_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+
+class Metrics:
+    """
+    Метрики решений в текстовом формате Prometheus (для GET /metrics).
+
+    Значения накапливаются в памяти процесса: при нескольких воркерах gunicorn
+    каждый воркер отдаёт свои метрики.
+
+    Собирается по Solver.stats каждого решения:
+        cutter_solves_total{outcome} - количество решений по исходу
+        (done, no_solution, failed, cancelled, timeout, accepted, cached);
+        cutter_stage_seconds{stage} - время этапов решения;
+        cutter_patterns, cutter_variables - размер модели;
+        cutter_solver_status_total{stage, status} - статусы решателя на этапах.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._solves = {}  # outcome: количество
+        self._statuses = {}  # (stage, status): количество
+        self._stage_seconds = {}  # stage: _Histogram
+        self._patterns = _Histogram(SIZE_BUCKETS)
+        self._variables = _Histogram(SIZE_BUCKETS)
+
+    def observe(self, stats, outcome):
+        """Учитывает одно решение: stats - Solver.stats (может быть пустым), outcome - исход"""
+        with self._lock:
+            self._solves[outcome] = self._solves.get(outcome, 0) + 1
+            for stage, seconds in stats.get("timings", {}).items():
+                self._stage_seconds.setdefault(stage, _Histogram(SECONDS_BUCKETS)).observe(seconds)
+            if "patterns" in stats:
+                self._patterns.observe(stats["patterns"])
+            if "variables" in stats:
+                self._variables.observe(stats["variables"])
+            for stage in ("min_waste", "uniform"):
+                status = stats.get(f"{stage}_status")
+                if status is not None:
+                    self._statuses[(stage, status)] = self._statuses.get((stage, status), 0) + 1
+
+    def render(self, gauges=()):
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+        gauges - дополнительные значения: (имя, описание, {метки: значение}),
+        метки - кортеж пар (имя метки, значение).
+        """
+        lines = []
+        with self._lock:
+            _add_header(lines, "cutter_solves_total", "Количество решений по исходу", "counter")
+            for outcome, count in sorted(self._solves.items()):
+                lines.append(f"cutter_solves_total{_labels((('outcome', outcome),))} {count}")
+
+            _add_header(lines, "cutter_stage_seconds", "Время этапов решения в секундах", "histogram")
+            for stage, histogram in sorted(self._stage_seconds.items()):
+                histogram.render(lines, "cutter_stage_seconds", (("stage", stage),))
+
+            _add_header(lines, "cutter_patterns", "Количество комбинаций раскроя в модели", "histogram")
+            self._patterns.render(lines, "cutter_patterns")
+            _add_header(lines, "cutter_variables", "Количество переменных модели", "histogram")
+            self._variables.render(lines, "cutter_variables")
+
+            _add_header(lines, "cutter_solver_status_total", "Статусы решателя на этапах", "counter")
+            for (stage, status), count in sorted(self._statuses.items()):
+                labels = _labels((("stage", stage), ("status", status)))
+                lines.append(f"cutter_solver_status_total{labels} {count}")
+
+        for name, description, values in gauges:
+            _add_header(lines, name, description, "gauge")
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value):
+        for n, bound in enumerate(self._buckets):
+            if value <= bound:
+                self._counts[n] += 1
+        self._sum += value
+        self._count += 1
+
+    def render(self, lines, name, labels=()):
+        for bound, count in zip(self._buckets, self._counts):
+            lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {self._count}")
+        lines.append(f"{name}_sum{_labels(labels)} {self._sum}")
+        lines.append(f"{name}_count{_labels(labels)} {self._count}")
+
+
+def _add_header(lines, name, description, kind):
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
@@ -0,0 +1,168 @@
+import os
+import re
+import tempfile
+
+import pulp as lp
+import numpy as np
+
+
+class CuttingModel:
+    """
+    Модель целочисленного программирования для задачи раскроя.
+
+    Переменные и общие ограничения (склад и заказ) создаются один раз
+    по матрице комбинаций. Оба этапа решения работают с одной и той же моделью:
+    второй этап только добавляет ограничение на остаток, меняет целевую функцию
+    и стартует с решения первого этапа.
+
+    Атрибуты:
+        problem - задача PuLP.
+        x - переменные, x[p] - количество комбинации p в решении.
+        used_items - выражения, used_items[i] - количество использованных заготовок i.
+        total_waste - выражение для суммарного остатка.
+        bound - доказанная решателем нижняя оценка целевой функции после solve()
+        (None, если решатель её не сообщил).
+
+    stock_rows - маска заготовок, для которых нужно ограничение склада
+    (по умолчанию для всех, лишние находит presolve.presolve).
+
+    Параметры решателя (применяются к каждому вызову solve):
+        backend - "cbc" или "highs" (HiGHS через highspy).
+        time_limit - лимит времени в секундах, после которого возвращается
+        лучшее найденное решение.
+        gap - допустимый относительный разрыв между решением и нижней оценкой.
+        threads - количество потоков решателя.
+    """
+    BACKENDS = ("cbc", "highs")
+
+    def __init__(self, patterns, stock_quantities, demand_quantities, name="Cutting_stock",
+                 stock_rows=None,
+                 backend="cbc", time_limit=None, gap=None, threads=None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.problem = lp.LpProblem(name, lp.LpMinimize)
+        self._patterns = patterns
+        self._backend = backend
+        self._time_limit = time_limit
+        self._gap = gap
+        self._threads = threads
+        self.bound = None
+
+        # ПЕРВОЕ ОГРАНИЧЕНИЕ: x[p] >= 0, целое, не больше количества заготовки на складе
+        self.x = [lp.LpVariable(f"x{p}", lowBound=0, upBound=stock_quantities[i], cat=lp.LpInteger)
+                  for p, i in enumerate(patterns.stock_index.tolist())]
+
+        self.total_waste = lp.LpAffineExpression(zip(self.x, patterns.waste.tolist()))
+
+        # ВТОРОЕ ОГРАНИЧЕНИЕ: не больше заготовок, чем на складе
+        self.used_items = []
+        for i, rows in enumerate(patterns.rows_by_stock(len(stock_quantities))):
+            used = lp.LpAffineExpression((self.x[p], 1) for p in rows.tolist())
+            self.used_items.append(used)
+            if stock_rows is None or stock_rows[i]:
+                self.problem += lp.LpConstraint(used, lp.LpConstraintLE, f"stock{i}", stock_quantities[i])
+
+        # ТРЕТЬЕ ОГРАНИЧЕНИЕ: получено ровно столько отрезков, сколько заказано
+        for k, required in enumerate(demand_quantities):
+            rows = patterns.rows_with_piece(k)
+            produced = lp.LpAffineExpression(
+                zip([self.x[p] for p in rows.tolist()], patterns.counts[rows, k].tolist()))
+            self.problem += lp.LpConstraint(produced, lp.LpConstraintEQ, f"demand{k}", required)
+
+    @property
+    def n_variables(self):
+        return len(self.problem.variables())
+
+    @property
+    def n_constraints(self):
+        return len(self.problem.constraints)
+
+    def set_objective(self, objective):
+        self.problem.setObjective(objective)
+
+    def add_constraint(self, constraint, name=None):
+        self.problem.addConstraint(constraint, name)
+
+    @staticmethod
+    def _initial_value(variable):
+        """
+        Значение переменной из предыдущего решения, пригодное для начального:
+        решатель возвращает значения с погрешностью (например, -4.8e-16),
+        а setInitialValue не принимает выход за границы переменной.
+        """
+        value = variable.varValue
+        if variable.cat == lp.LpInteger:
+            value = round(value)
+        if variable.lowBound is not None:
+            value = max(value, variable.lowBound)
+        if variable.upBound is not None:
+            value = min(value, variable.upBound)
+        return value
+
+    def solve(self, warm_start=False, on_incumbent=None):
+        """
+        Решает текущую задачу и возвращает статус решения PuLP (LpSolution...):
+        LpSolutionOptimal, LpSolutionIntegerFeasible (остановка по лимиту времени
+        или по gap с найденным решением), LpSolutionNoSolutionFound или LpSolutionInfeasible.
+        При warm_start=True решатель стартует с текущих значений переменных
+        (например, с решения предыдущего этапа).
+
+        on_incumbent - функция (solution), вызывается во время поиска для каждого
+        улучшенного решения (solution - как у метода solution()). Поддерживается
+        только HiGHS: CBC пишет лог блоками, и найденные решения видны в нём с задержкой.
+        """
+        if warm_start:
+            for variable in self.problem.variables():
+                if variable.varValue is not None:
+                    variable.setInitialValue(self._initial_value(variable))
+
+        if self._backend == "highs":
+            callbacks = {}
+            if on_incumbent is not None:
+                callbacks = {
+                    "callbackTuple": (self._highs_callback, on_incumbent),
+                    "callbacksToActivate": [lp.HiGHS.hscb.HighsCallbackType.kCallbackMipImprovingSolution],
+                }
+            solver = lp.HiGHS(msg=False, timeLimit=self._time_limit, gapRel=self._gap,
+                              threads=self._threads, **callbacks)
+            self.problem.solve(solver)
+            self.bound = self._read_highs_bound()
+        else:
+            # Нижнюю оценку CBC сообщает только в логе
+            log_file, log_path = tempfile.mkstemp(suffix=".log")
+            os.close(log_file)
+            try:
+                solver = lp.PULP_CBC_CMD(msg=False, timeLimit=self._time_limit, gapRel=self._gap,
+                                         threads=self._threads, warmStart=warm_start,
+                                         logPath=log_path)
+                self.problem.solve(solver)
+                self.bound = self._read_cbc_bound(log_path)
+            finally:
+                os.remove(log_path)
+
+        if self.problem.sol_status == lp.LpSolutionOptimal and self.bound is None:
+            self.bound = lp.value(self.problem.objective)
+        return self.problem.sol_status
+
+    def _read_cbc_bound(self, log_path):
+        with open(log_path, encoding="utf-8", errors="replace") as log:
+            text = log.read()
+        # Строка "Lower bound: 1.199" есть в итогах, только если поиск остановлен
+        # досрочно (лимит времени или gap); при доказанной оптимальности её нет
+        match = re.search(r"Lower bound:\s*(-?[\d.eE+-]+)", text)
+        return float(match.group(1)) if match else None
+
+    def _highs_callback(self, callback_type, message, data_out, data_in, on_incumbent):
+        # Номера столбцов HiGHS задаются при построении модели (variable.index)
+        values = data_out.mip_solution
+        on_incumbent(np.array([round(values[variable.index]) for variable in self.x], dtype=np.int64))
+
+    def _read_highs_bound(self):
+        solver_model = getattr(self.problem, "solverModel", None)
+        if solver_model is None:
+            return None
+        return solver_model.getInfo().mip_dual_bound
+
+    def solution(self):
+        """Возвращает количество каждой комбинации в найденном решении"""
+        return np.array([round(variable.varValue or 0) for variable in self.x], dtype=np.int64)
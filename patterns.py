@@ -0,0 +1,307 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PatternMatrix:
+    """
+    Хранилище комбинаций раскроя для всех заготовок в непрерывных массивах NumPy.
+
+    Атрибуты:
+        counts - целочисленная матрица (комбинации x отрезки),
+        counts[p][k] - количество k-го отрезка в комбинации p.
+        waste - остаток каждой комбинации в целых единицах длины (см. Solver, resolution).
+        stock_index - индекс заготовки, из которой режется комбинация.
+    """
+
+    def __init__(self, counts, waste, stock_index):
+        self.counts = np.ascontiguousarray(counts, dtype=_count_dtype(counts))
+        self.waste = np.ascontiguousarray(waste, dtype=_length_dtype(waste))
+        self.stock_index = np.ascontiguousarray(stock_index, dtype=np.int32)
+
+    @classmethod
+    def from_blocks(cls, blocks, n_pieces):
+        """Собирает матрицу из блоков (counts, waste), по одному на каждую заготовку"""
+        if not blocks:
+            return cls(np.zeros((0, n_pieces)), np.zeros(0), np.zeros(0))
+        if len(blocks) == 1:
+            counts, waste = blocks[0]  # без копирования
+            counts = counts.reshape(-1, n_pieces)
+        else:
+            counts = np.vstack([counts for counts, _ in blocks]).reshape(-1, n_pieces)
+            waste = np.concatenate([waste for _, waste in blocks])
+        stock_index = np.repeat(np.arange(len(blocks)), [len(waste) for _, waste in blocks])
+        return cls(counts, waste, stock_index)
+
+    def __len__(self):
+        return len(self.waste)
+
+    def rows_of_stock(self, i):
+        """Индексы комбинаций i-й заготовки"""
+        return np.flatnonzero(self.stock_index == i)
+
+    def rows_by_stock(self, n_stock):
+        """Индексы комбинаций, сгруппированные по заготовкам (один проход по массиву)"""
+        order = np.argsort(self.stock_index, kind="stable")
+        bounds = np.searchsorted(self.stock_index[order], np.arange(1, n_stock))
+        return np.split(order, bounds)
+
+    def rows_with_piece(self, k):
+        """Индексы комбинаций, содержащих k-й отрезок"""
+        return np.flatnonzero(self.counts[:, k])
+
+    def find(self, i, piece_quantities):
+        """Индекс комбинации piece_quantities i-й заготовки или None, если её нет"""
+        rows = self.rows_of_stock(i)
+        found = rows[(self.counts[rows] == np.asarray(piece_quantities)).all(axis=1)]
+        return int(found[0]) if len(found) else None
+
+    def contains(self, i, piece_quantities):
+        """Проверяет, есть ли комбинация piece_quantities у i-й заготовки"""
+        return self.find(i, piece_quantities) is not None
+
+    def append(self, i, piece_quantities, waste):
+        """Добавляет одну комбинацию i-й заготовки"""
+        counts = np.vstack((self.counts, np.asarray(piece_quantities)[None, :]))
+        self.__init__(counts, np.append(self.waste, waste), np.append(self.stock_index, i))
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes + self.waste.nbytes + self.stock_index.nbytes
+
+
+class TooManyPatterns(Exception):
+    """Полный перебор даёт больше комбинаций, чем разрешено (max_patterns)"""
+
+
+# Ограничение полного перебора по умолчанию (Solver, max_patterns): около 100 МБ
+# комбинаций в памяти, а модель решателя на таком числе переменных уже занимает гигабайты
+MAX_PATTERNS = 2_000_000
+
+# Сколько строк нового слоя перебора строится за одну операцию NumPy:
+# ограничивает временные массивы индексов
+BLOCK_ROWS = 2**20
+
+
+def enumerate_patterns(stock_len, demand_lengths, demand_quantities, base=None, max_patterns=None):
+    """
+    Перебирает все допустимые комбинации для одной заготовки.
+    Длины - целые числа (единицы длины Solver), поэтому сравнения точные.
+
+    Перебор идёт по отрезкам, а не по отдельным комбинациям: на k-м шаге
+    каждая частичная комбинация (строка массива counts) расширяется всеми
+    возможными количествами k-го отрезка сразу, с пересчётом остатков
+    (remainders) операциями NumPy. Размер нового слоя известен заранее
+    (сумма по строкам числа помещающихся количеств), поэтому слой пишется
+    в готовые массивы компактных типов блоками по BLOCK_ROWS строк:
+    в памяти одновременно только два слоя и временные массивы одного блока.
+
+    Количество отрезка в комбинации ограничено заказанным количеством:
+    из-за ограничения "получено == заказано" комбинация, дающая больше
+    отрезков, чем заказано, в решение попасть не может.
+
+    base - уже перебранные комбинации других отрезков (counts, остатки), включая
+    пустую: перебор продолжается с них, новые отрезки добавляются столбцами справа.
+
+    max_patterns - наибольшее допустимое число комбинаций: слои перебора только
+    растут, поэтому при превышении на любом шаге перебор прекращается
+    с исключением TooManyPatterns, до выделения памяти под слой.
+
+    Возвращает массив количеств (комбинации x отрезки) и массив остатков.
+    """
+    max_quantities = [min(int(stock_len // demand_len), int(demand_qty))
+                      for demand_len, demand_qty in zip(demand_lengths, demand_quantities)]
+    if base is None:
+        counts = np.zeros((1, 0), dtype=_count_dtype(max_quantities))
+        remainders = np.array([stock_len], dtype=_length_dtype(stock_len))
+    else:
+        counts, remainders = base
+        counts = counts.astype(np.promote_types(_count_dtype(max_quantities), counts.dtype), copy=False)
+        remainders = remainders.astype(_length_dtype(stock_len), copy=False)
+    for demand_len, max_qty in zip(demand_lengths, max_quantities):
+        # Число продолжений каждой строки: количества 0..max_qty, пока остаток неотрицателен
+        extensions = np.minimum(remainders // demand_len, max_qty) + 1
+        ends = np.cumsum(extensions, dtype=np.int64)
+        total = int(ends[-1]) if len(ends) else 0
+        if max_patterns is not None and total - 1 > max_patterns:
+            raise TooManyPatterns(total - 1)
+
+        new_counts = np.empty((total, counts.shape[1] + 1), dtype=counts.dtype)
+        new_remainders = np.empty(total, dtype=remainders.dtype)
+        start = 0
+        while start < len(remainders):
+            # Блок строк, продолжения которых занимают не больше BLOCK_ROWS строк нового слоя
+            offset = int(ends[start - 1]) if start else 0
+            stop = max(int(np.searchsorted(ends, offset + BLOCK_ROWS, side="right")), start + 1)
+            block = extensions[start:stop]
+            rows = np.repeat(np.arange(start, stop), block)
+            quantities = np.arange(len(rows)) - np.repeat(ends[start:stop] - block - offset, block)
+            out = slice(offset, offset + len(rows))
+            new_counts[out, :-1] = counts[rows]
+            new_counts[out, -1] = quantities
+            new_remainders[out] = remainders[rows] - quantities * demand_len
+            start = stop
+        counts, remainders = new_counts, new_remainders
+
+    # пустая комбинация (ничего не отрезаем) не нужна; она первая, если есть
+    if len(counts) and not counts[0].any():
+        return counts[1:], remainders[1:]
+    nonempty = counts.any(axis=1)
+    return counts[nonempty], remainders[nonempty]
+
+
+class PatternCache:
+    """
+    Общий для процесса кэш комбинаций раскроя.
+
+    Комбинации зависят только от длины заготовки, набора длин отрезков и
+    ограничений на количество каждого отрезка (caps), но не от остального заказа.
+    Запись с ключом (длина заготовки, длины отрезков, caps) хранит комбинации,
+    перебранные с ограничениями caps, и подходит для любого заказа, у которого
+    ограничения не больше: лишние комбинации отфильтровываются.
+    Заказ с другими ограничениями перебирается со своими caps, а не с их
+    объединением с записью: объединение может дать на порядки больше комбинаций,
+    чем нужно заказу, и превысить max_patterns из-за предыдущих заказов.
+    Запись, ограничения которой не больше ограничений новой, удаляется.
+    Запись с большим набором длин отрезков тоже подходит: остаются комбинации
+    без отсутствующих в заказе отрезков.
+
+    Объём кэша ограничен max_bytes, при превышении удаляются давно не использованные записи.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()  # (stock_len, lengths, caps): (caps, counts, waste)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.extended = 0
+
+    def enumerate(self, stock_len, demand_lengths, demand_quantities, max_patterns=None):
+        """То же, что enumerate_patterns, но с повторным использованием кэша"""
+        lengths = tuple(demand_lengths)
+        caps = np.array([min(stock_len // l, qty)
+                         for l, qty in zip(demand_lengths, demand_quantities)], dtype=np.int64)
+
+        found = self._lookup(stock_len, lengths, caps)
+        if found is not None:
+            if max_patterns is not None and len(found[1]) > max_patterns:
+                raise TooManyPatterns(len(found[1]))
+            return found
+
+        counts, waste = self._extend(stock_len, lengths, caps, max_patterns)
+        self._store(stock_len, lengths, caps, counts, waste)
+        return counts, waste
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "extended": self.extended,
+                    "entries": len(self._entries), "bytes": self._bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _lookup(self, stock_len, lengths, caps):
+        with self._lock:
+            for key, (entry_caps, counts, waste) in reversed(self._entries.items()):
+                entry_len, entry_lengths, _ = key
+                if entry_len != stock_len or not set(lengths) <= set(entry_lengths):
+                    continue
+                columns = [entry_lengths.index(l) for l in lengths]
+                if (entry_caps[columns] < caps).any():
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                break
+            else:
+                self.misses += 1
+                return None
+        return self._filter(counts, waste, caps, columns)
+
+    def _extend(self, stock_len, lengths, caps, max_patterns=None):
+        """
+        Перебирает комбинации, по возможности продолжая запись с частью тех же длин:
+        при добавлении в заказ новой длины перебираются только комбинации с ней.
+        Подходит запись той же заготовки с наибольшим числом общих длин и
+        ограничениями на них не меньше caps; её комбинации (и пустая) дополняются
+        новыми отрезками, как на очередном шаге enumerate_patterns.
+        """
+        best = None
+        with self._lock:
+            for (entry_len, entry_lengths, _), (entry_caps, counts, waste) in self._entries.items():
+                if entry_len != stock_len:
+                    continue
+                common = [l for l in lengths if l in entry_lengths]
+                columns = [entry_lengths.index(l) for l in common]
+                indices = [lengths.index(l) for l in common]
+                if not common or (entry_caps[columns] < caps[indices]).any():
+                    continue
+                if best is None or len(common) > len(best[0]):
+                    best = (common, columns, indices, counts, waste)
+        if best is None:
+            return enumerate_patterns(stock_len, lengths, caps, max_patterns=max_patterns)
+
+        common, columns, indices, counts, waste = best
+        counts, waste = self._filter(counts, waste, caps[indices], columns)
+        # Пустая комбинация - тоже начало для комбинаций только из новых отрезков
+        base = (np.vstack((np.zeros((1, len(common)), dtype=counts.dtype), counts)),
+                np.concatenate(([stock_len], waste)).astype(_length_dtype(stock_len)))
+        new = [k for k, l in enumerate(lengths) if l not in common]
+        counts, waste = enumerate_patterns(stock_len, [lengths[k] for k in new], caps[new], base=base,
+                                           max_patterns=max_patterns)
+        with self._lock:
+            self.extended += 1
+        # Столбцы: сначала общие длины, затем новые; возвращаем порядок lengths
+        order = np.argsort(indices + new)
+        return counts[:, order], waste
+
+    def _filter(self, counts, waste, caps, columns):
+        """Оставляет комбинации с отрезками из columns, не превышающие caps"""
+        other = np.setdiff1d(np.arange(counts.shape[1]), columns)
+        mask = (counts[:, columns] <= caps).all(axis=1)
+        if len(other):
+            mask &= ~counts[:, other].any(axis=1)
+        if mask.all() and columns == list(range(counts.shape[1])):
+            # Подходят все комбинации: возвращаем массивы записи без копирования
+            # (комбинации не изменяются на месте, PatternMatrix.append создаёт новые массивы)
+            return counts, waste
+        return counts[np.flatnonzero(mask)[:, None], columns], waste[mask]
+
+    def _store(self, stock_len, lengths, caps, counts, waste):
+        counts = counts.astype(_count_dtype(counts), copy=False)
+        waste = waste.astype(_length_dtype(waste), copy=False)
+        size = counts.nbytes + waste.nbytes
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            # Записи тех же длин с ограничениями не больше caps новой записью покрываются
+            covered = [key for key, (entry_caps, _, _) in self._entries.items()
+                       if key[:2] == (stock_len, lengths) and (entry_caps <= caps).all()]
+            for key in covered:
+                _, old_counts, old_waste = self._entries.pop(key)
+                self._bytes -= old_counts.nbytes + old_waste.nbytes
+            self._entries[(stock_len, lengths, tuple(caps.tolist()))] = (caps, counts, waste)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                _, (_, old_counts, old_waste) = self._entries.popitem(last=False)
+                self._bytes -= old_counts.nbytes + old_waste.nbytes
+
+
+# Кэш комбинаций, общий для всех решений в процессе
+pattern_cache = PatternCache()
+
+
+def _count_dtype(counts):
+    """Минимальный знаковый тип, в который помещаются количества отрезков"""
+    max_count = int(np.max(counts)) if np.size(counts) else 0
+    return np.int16 if max_count <= np.iinfo(np.int16).max else np.int32
+
+
+def _length_dtype(lengths):
+    """Минимальный знаковый тип для длин в целых единицах (int32 до 2^31 единиц)"""
+    max_length = int(np.max(lengths)) if np.size(lengths) else 0
+    return np.int32 if max_length <= np.iinfo(np.int32).max else np.int64
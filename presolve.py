@@ -0,0 +1,77 @@
+import numpy as np
+
+from patterns import PatternMatrix
+
+
+def check_capacity(stock_lengths, stock_quantities, demand_lengths, demand_quantities):
+    """
+    Быстрая проверка разрешимости до перебора комбинаций.
+
+    Отрезки длины не меньше l можно получить только из заготовок длины не меньше l,
+    поэтому для каждой длины отрезка l суммарная длина таких отрезков не должна
+    превышать суммарную длину таких заготовок. При наименьшем l это сравнение
+    всей длины заказа со всей длиной склада.
+
+    Длины - целые (единицы Solver, с учётом пропила и торцовки), сравнения точные.
+    Возвращает True, если проверка пройдена (это не гарантирует разрешимость).
+    """
+    stock_lengths = np.asarray(stock_lengths, dtype=np.int64)
+    stock_total = np.asarray(stock_quantities, dtype=np.int64) * stock_lengths
+    demand_lengths = np.asarray(demand_lengths, dtype=np.int64)
+    demand_total = np.asarray(demand_quantities, dtype=np.int64) * demand_lengths
+    for length in demand_lengths:
+        required = demand_total[demand_lengths >= length].sum()
+        available = stock_total[stock_lengths >= length].sum()
+        if required > available:
+            return False
+    return True
+
+
+def presolve(patterns, stock_quantities, demand_quantities):
+    """
+    Сокращает модель перед построением (между перебором комбинаций и CuttingModel).
+
+    1. Верхняя граница каждой комбинации p: её нельзя повторить больше, чем
+       позволяет заказ (min по отрезкам k заказано_k // counts[p][k])
+       и склад (количество заготовки).
+    2. Комбинации с границей 0 (дают какого-то отрезка больше, чем заказано)
+       удаляются.
+    3. Ограничение склада для заготовки i лишнее, если заготовок i и так
+       не может понадобиться больше, чем есть: каждая заготовка даёт хотя бы
+       один отрезок, и каждая комбинация ограничена своей границей.
+       Строки склада с одинаковой длиной уже объединены в Solver._validate_data.
+
+    Границы из п. 1 в модель не передаются: CBC сам выводит их из ограничений
+    заказа, а явные границы на части заказов сильно замедляли доказательство
+    оптимальности (CUTGEN класс 17: 0.8 с без них, больше 30 с с ними).
+
+    Возвращает (комбинации, маска нужных ограничений склада, отчёт).
+    Отчёт содержит только применённые сокращения: число комбинаций до и после
+    (patterns_before, patterns_after) и число убранных ограничений склада
+    (redundant_stock_rows), а также uncovered - индексы отрезков, которых нет
+    ни в одной комбинации (тогда заказ невыполним).
+    """
+    stock_quantities = np.asarray(stock_quantities, dtype=np.int64)
+    demand_quantities = np.asarray(demand_quantities, dtype=np.int64)
+    counts = patterns.counts.astype(np.int64)
+
+    # Граница по заказу: для отрезков, которых нет в комбинации, ограничения нет
+    by_demand = np.where(counts > 0, demand_quantities // np.maximum(counts, 1), np.iinfo(np.int64).max)
+    upper_bounds = np.minimum(by_demand.min(axis=1), stock_quantities[patterns.stock_index])
+
+    keep = upper_bounds > 0
+    reduced = PatternMatrix(patterns.counts[keep], patterns.waste[keep], patterns.stock_index[keep])
+    upper_bounds = upper_bounds[keep]
+
+    n_stock = len(stock_quantities)
+    max_used = np.bincount(reduced.stock_index, weights=upper_bounds, minlength=n_stock)
+    max_used = np.minimum(max_used, demand_quantities.sum())
+    stock_rows = max_used > stock_quantities
+
+    report = {
+        "patterns_before": len(patterns),
+        "patterns_after": len(reduced),
+        "redundant_stock_rows": int((~stock_rows).sum()),
+        "uncovered": np.flatnonzero(~reduced.counts.any(axis=0)).tolist(),
+    }
+    return reduced, stock_rows, report
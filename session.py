@@ -0,0 +1,36 @@
+from algorithm import Solver
+
+
+class SolveSession:
+    """
+    Сеанс последовательных правок одного заказа.
+
+    Каждое решение стартует с плана предыдущего (Solver(warm_start=...)):
+    при изменении количеств решатель сразу получает близкое допустимое решение,
+    а не ищет его заново. Комбинации раскроя переиспользуются через общий кэш
+    patterns.pattern_cache: при уменьшении количеств они берутся из кэша,
+    при добавлении длины отрезка перебираются только комбинации с новой длиной,
+    при удалении длины отбрасываются комбинации с ней.
+
+    Пример:
+        session = SolveSession(time_limit=30)
+        session.solve(order)
+        order["demand_qty2"] = "12"
+        session.solve(order)  # старт с предыдущего плана
+
+    Параметры - те же, что у Solver (mode, uniformity, time_limit, ...).
+    """
+
+    def __init__(self, plan=None, **solver_options):
+        self._solver_options = solver_options
+        self.plan = plan
+        self.stats = {}
+
+    def solve(self, user_input, progress=None):
+        """Решает изменённый заказ, начиная с плана предыдущего решения"""
+        solver = Solver(user_input, progress=progress, warm_start=self.plan, **self._solver_options)
+        result = solver.solve()
+        self.stats = solver.stats
+        if solver.plan() is not None:
+            self.plan = solver.plan()
+        return result
@@ -1,20 +1,190 @@
-// Отправка формы
+// Тексты для этапов решения
+const STAGE_TEXT = {
+    'heuristic': 'Быстрый расчёт...',
+    'lp_bound': 'Расчёт нижней оценки отходов...',
+    'enumeration': 'Перебор вариантов раскроя...',
+    'min_waste': 'Поиск минимального остатка...',
+    'uniform': 'Поиск равномерного решения...',
+    'done': 'Оформление результата...'
+};
+const POLL_INTERVAL = 500; // мс
+let currentJobId = null;
+let currentEvents = null;
+// Сеанс страницы: сервер начинает решение изменённого заказа с плана предыдущего
+const SESSION_ID = Date.now().toString(36) + Math.random().toString(36).slice(2);
+let currentMode = null;
+
+// Отправка формы: задача ставится в очередь, затем сервер присылает её состояние
+// потоком событий (если поток недоступен - состояние опрашивается)
 document.getElementById('algorithm-form').addEventListener('submit', function(e) {
     e.preventDefault();
     console.log("Form submitted!");
     
     const formData = new FormData(this);
-    fetch('/process', {
+    currentMode = formData.get('mode');
+    formData.append('session', SESSION_ID);
+    document.getElementById('refine-button').hidden = true;
+    // Прежняя задача больше не отслеживается (даже если сервер вернёт её же для того же заказа)
+    currentJobId = null;
+    closeEvents();
+    fetch('/jobs', {
         method: 'POST',
         body: formData
     })
     .then(response => response.json())
-    .then(data => {
-        document.getElementById('result').innerHTML = data.result;
+    .then(handleJob)
+    .catch(error => {
+        console.error('Error:', error);
+    });
+});
+
+// Обработка состояния задачи
+function handleJob(job) {
+    const result = document.getElementById('result');
+    const cancelButton = document.getElementById('cancel-button');
+    const acceptButton = document.getElementById('accept-button');
+
+    if (job.status === 'queued' || job.status === 'running') {
+        const isNew = job.id !== currentJobId;
+        currentJobId = job.id;
+        cancelButton.hidden = false;
+        // Лучшее решение на данный момент можно принять, не дожидаясь конца расчёта
+        acceptButton.hidden = !job.incumbent;
+        result.innerHTML = progressText(job);
+        if (job.incumbent) {
+            result.innerHTML += `\n\nЛучшее решение на данный момент:\n\n${job.incumbent.result}`;
+        }
+        if (isNew) {
+            watchJob(job.id);
+        }
+        return;
+    }
+
+    currentJobId = null;
+    closeEvents();
+    cancelButton.hidden = true;
+    acceptButton.hidden = true;
+    if (job.status === 'done') {
+        result.innerHTML = job.result;
+        // Приближённое решение можно уточнить точным расчётом
+        document.getElementById('refine-button').hidden = currentMode !== 'heuristic';
+    } else if (job.status === 'accepted') {
+        result.innerHTML = job.result + '\nПринято промежуточное решение, расчёт остановлен';
+    } else if (job.status === 'cancelled') {
+        result.innerHTML = 'Расчёт отменён';
+    } else {
+        result.innerHTML = job.error;
+    }
+}
+
+// Подписка на поток событий задачи
+function watchJob(jobId) {
+    closeEvents();
+    if (!window.EventSource) {
+        setTimeout(() => pollJob(jobId), POLL_INTERVAL);
+        return;
+    }
+    const events = new EventSource(`/jobs/${jobId}/events`);
+    events.onmessage = function(event) {
+        if (jobId === currentJobId) {
+            handleJob(JSON.parse(event.data));
+        }
+    };
+    // Поток оборвался (например, его не пропускает прокси) - переходим на опрос
+    events.onerror = function() {
+        if (events === currentEvents) {
+            closeEvents();
+            setTimeout(() => pollJob(jobId), POLL_INTERVAL);
+        }
+    };
+    currentEvents = events;
+}
+
+function closeEvents() {
+    if (currentEvents !== null) {
+        currentEvents.close();
+        currentEvents = null;
+    }
+}
+
+// Опрос статуса задачи
+function pollJob(jobId) {
+    // Задача уже отменена или заменена новой
+    if (jobId !== currentJobId) {
+        return;
+    }
+    fetch(`/jobs/${jobId}`)
+    .then(response => response.json())
+    .then(job => {
+        if (jobId === currentJobId) {
+            handleJob(job);
+            if (job.status === 'queued' || job.status === 'running') {
+                setTimeout(() => pollJob(jobId), POLL_INTERVAL);
+            }
+        }
     })
     .catch(error => {
         console.error('Error:', error);
     });
+}
+
+// Текст прогресса задачи
+function progressText(job) {
+    if (job.status === 'queued') {
+        return 'Задача в очереди...';
+    }
+    let text = 'Выполняется расчёт...';
+    if (job.progress && STAGE_TEXT[job.progress.stage]) {
+        text = STAGE_TEXT[job.progress.stage];
+    }
+    if (job.progress && job.progress.patterns) {
+        text += ` (вариантов раскроя: ${job.progress.patterns})`;
+    }
+    if (job.incumbent) {
+        text += `\nЛучший найденный остаток: ${job.incumbent.waste.toFixed(3)} м`;
+    }
+    return `${text}\nПрошло: ${job.elapsed.toFixed(1)} с`;
+}
+
+// Отмена текущей задачи
+document.getElementById('cancel-button').addEventListener('click', function() {
+    if (currentJobId === null) {
+        return;
+    }
+    fetch(`/jobs/${currentJobId}`, {
+        method: 'DELETE'
+    })
+    .then(response => response.json())
+    .then(handleJob)
+    .catch(error => {
+        console.error('Error:', error);
+    });
+});
+
+// Остановка расчёта с лучшим найденным решением
+document.getElementById('accept-button').addEventListener('click', function() {
+    if (currentJobId === null) {
+        return;
+    }
+    fetch(`/jobs/${currentJobId}/accept`, {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(job => {
+        // Задача успела завершиться: итоговое состояние придёт из потока событий
+        if (job.status) {
+            handleJob(job);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+});
+
+// Точный расчёт того же заказа после быстрого
+document.getElementById('refine-button').addEventListener('click', function() {
+    document.getElementById('mode-select').value = 'full';
+    document.getElementById('algorithm-form').requestSubmit();
 });
 
 // Добавление строки в таблицу склада